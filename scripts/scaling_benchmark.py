@@ -0,0 +1,120 @@
+"""
+Measures how the engine scales with the size of the galaxy and the number of
+players: decision latency (encoding the board and one forward pass), peak
+memory and self-play throughput. Every configuration runs in a fresh
+interpreter so its peak memory is its own.
+
+Run from the repository root:
+    python scripts/scaling_benchmark.py
+    python scripts/scaling_benchmark.py --radii 3 4 5 6 --players 3 6 8 --games 2 --rounds 2
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+def probe(radius, num_players, num_games, max_rounds, decisions, seed):
+    """Benchmarks one configuration, returns the results as a dict"""
+    import time
+    import resource
+    import statistics
+    import numpy as np
+
+    sys.path.insert(0, "src/main")
+    from map import generate_map_string
+    from trainer import create_models, create_players, random_starting_systems
+    from vector_simulation import VectorSimulation
+
+    map_string = generate_map_string(radius, num_players, seed=seed)
+    models = create_models(num_players, epsilon=0.0)
+    env = VectorSimulation(num_games, models, max_rounds=max_rounds, map_string=map_string)
+    players = [create_players(sim, models) for sim in env.games]
+    env.reset(seeds=[seed + i for i in range(num_games)], players=players,
+              starting_systems=[sim.game_map.get_start_tiles() for sim in env.games])
+
+    game_map = env.games[0].game_map
+    player = env.games[0].players[0]
+
+    # a single decision, the way a turn makes it
+    latencies = []
+    for _ in range(decisions + 1):
+        start = time.perf_counter()
+        player.model.choose_action(player.get_state(game_map))
+        latencies.append(time.perf_counter() - start)
+
+    # a decision for every seat of every game, one batch per model, the way
+    # VectorSimulation makes them
+    batches = [[sim.players[seat].get_state(sim.game_map) for sim in env.games] for seat in range(num_players)]
+    batch_latencies = []
+    for _ in range(decisions + 1):
+        start = time.perf_counter()
+        for model, states in zip(models, batches):
+            model.choose_actions(states)
+        batch_latencies.append(time.perf_counter() - start)
+
+    env.reset(players=players, starting_systems=random_starting_systems(env))
+    turns = 0
+    start = time.perf_counter()
+    while (taken := env.step()):
+        turns += taken
+    elapsed = time.perf_counter() - start
+
+    return {
+        "radius": radius,
+        "players": num_players,
+        "tiles": len(game_map.tiles),
+        # the adjacency holds both directions of every pair of neighboring tiles
+        "edges": int(np.count_nonzero(np.triu(game_map.get_adjacency(), k=1))),
+        # the first call of each traces the model
+        "decision_ms": statistics.median(latencies[1:]) * 1000,
+        "batch_ms": statistics.median(batch_latencies[1:]) * 1000,
+        "batch_size": num_games * num_players,
+        "games_per_s": num_games / elapsed,
+        "turns_per_s": turns / elapsed,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+def run(radius, num_players, args):
+    """Runs probe in a fresh interpreter, returns its results or the error"""
+    out = subprocess.run(
+        [sys.executable, __file__, "--probe", str(radius), str(num_players),
+         "--games", str(args.games), "--rounds", str(args.rounds),
+         "--decisions", str(args.decisions), "--seed", str(args.seed)],
+        capture_output=True, text=True, env=dict(os.environ, TF_CPP_MIN_LOG_LEVEL="3"),
+    )
+    if out.returncode != 0:
+        return {"radius": radius, "players": num_players, "error": out.stderr.strip().splitlines()[-1]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--radii", type=int, nargs="+", default=[3, 4, 5])
+    parser.add_argument("--players", type=int, nargs="+", default=[3, 6, 8])
+    parser.add_argument("--games", type=int, default=2, help="games played in lockstep per configuration")
+    parser.add_argument("--rounds", type=int, default=1, help="rounds per game")
+    parser.add_argument("--decisions", type=int, default=50, help="timed decisions per configuration")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--probe", type=int, nargs=2, metavar=("RADIUS", "PLAYERS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        print(json.dumps(probe(*args.probe, args.games, args.rounds, args.decisions, args.seed)))
+        return
+
+    print(f"{'radius':>6}{'players':>8}{'tiles':>7}{'edges':>7}{'decision (ms)':>15}"
+          f"{'batch (ms)':>17}{'games/s':>10}{'turns/s':>10}{'peak (MB)':>11}")
+    for radius in args.radii:
+        for num_players in args.players:
+            result = run(radius, num_players, args)
+            if "error" in result:
+                print(f"{radius:>6}{num_players:>8}  failed: {result['error']}")
+                continue
+            batch = f"{result['batch_ms']:.2f} x{result['batch_size']}"
+            print(f"{radius:>6}{num_players:>8}{result['tiles']:>7}{result['edges']:>7}{result['decision_ms']:>15.2f}"
+                  f"{batch:>17}{result['games_per_s']:>10.3f}{result['turns_per_s']:>10.2f}{result['peak_mb']:>11.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Measures how long the entry points take to import in a fresh interpreter and
+checks them against a budget. Heavy frameworks (TensorFlow, Pyomo,
+matplotlib) must only be loaded on first use, so none of these should pay
+for them.
+
+Run from the repository root:
+    python scripts/startup_budget.py
+"""
+
+import os
+import sys
+import subprocess
+
+# module imported from src/main -> budget in seconds
+BUDGETS = {
+    "simulation": 0.5,   # headless rule engine
+    "trainer": 0.5,      # training entry point, TensorFlow loads when the Trainer is built
+    "main": 1.0,         # GUI entry point, includes pygame
+    "combat.main": 0.5,  # combat analysis, matplotlib loads when a graph is drawn
+}
+
+HEAVY_MODULES = ["tensorflow", "pyomo", "matplotlib"]
+
+PROBE = """
+import sys, time
+sys.path.insert(0, "src/main")
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed, ",".join(heavy) or "-")
+"""
+
+def measure(module, repeats=3):
+    """
+    Returns the fastest of several cold imports and the heavy modules it loaded
+    """
+    best, heavy = None, "-"
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, env=dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1"),
+        )
+        if out.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{out.stderr}")
+        elapsed, heavy = out.stdout.strip().splitlines()[-1].split(" ", 1)
+        elapsed = float(elapsed)
+        best = elapsed if best is None else min(best, elapsed)
+    return best, heavy
+
+def main():
+    failed = False
+    print(f"{'entry point':<15}{'import (s)':>12}{'budget (s)':>12}  heavy modules loaded")
+    for module, budget in BUDGETS.items():
+        elapsed, heavy = measure(module)
+        over = elapsed > budget
+        failed |= over
+        print(f"{module:<15}{elapsed:>12.3f}{budget:>12.3f}  {heavy}{'  OVER BUDGET' if over else ''}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
-from pyomo.environ import *
-from utils import powerset, calculate_fleet_value
+from utils import LazyModule, powerset, calculate_fleet_value
 from combat_sim import run_n_simulations
+from log_writer import get_logger, Lazy
+
+pyo = LazyModule("pyomo.environ")
+logger = get_logger(__name__)
 
 def compute_system_benefit(system, disposition):
     resource_importance = disposition["resources"]
@@ -68,6 +71,7 @@ def attack(player):
     benefit_lookup = {}
     win_prob_lookup = {}
     pain_lookup = {}
+    ships_lookup = {} # the combo's ships in a fixed order, a frozenset's order changes between runs
 
     for system, ship_combos in system_options.items():
         for ships in ship_combos:
@@ -84,13 +88,14 @@ def attack(player):
             benefit_lookup[(system, ship_combo_key)] = benefit_val
             win_prob_lookup[(system, ship_combo_key)] = system_options[system][ships]
             pain_lookup[(system, ship_combo_key)] = compute_enemy_system_value(system, player)
+            ships_lookup[(system, ship_combo_key)] = ships
 
     if attack_options == []:
         return "failed"
 
     # Create model
-    model = ConcreteModel()
-    model.x = Var(attack_options, domain=Binary)
+    model = pyo.ConcreteModel()
+    model.x = pyo.Var(attack_options, domain=pyo.Binary)
 
     # Objective function
     def objective_rule(m):
@@ -102,11 +107,11 @@ def attack(player):
             )
             for (system, combo) in attack_options
         )
-    model.obj = Objective(rule=objective_rule, sense=maximize)
+    model.obj = pyo.Objective(rule=objective_rule, sense=pyo.maximize)
 
 
     # Only one attack choice
-    model.attack_once = Constraint(expr=sum(model.x[opt] for opt in attack_options) == 1)
+    model.attack_once = pyo.Constraint(expr=sum(model.x[opt] for opt in attack_options) == 1)
 
     # Fleet capacity constraint
     def total_ships_used(m):
@@ -118,22 +123,22 @@ def attack(player):
             total += m.x[(system, combo)] * num_non_fighters
         return total <= player.command_counters["fleet"]
         
-    model.fleet_cap_constraint = Constraint(rule=total_ships_used)
+    model.fleet_cap_constraint = pyo.Constraint(rule=total_ships_used)
 
    # Solve
-    solver = SolverFactory('glpk')
+    solver = pyo.SolverFactory('glpk')
     solver.solve(model)
 
     # Find the best attack option
-    best = max(attack_options, key=lambda opt: value(model.x[opt]))
-    system, combo = best
+    best = max(attack_options, key=lambda opt: pyo.value(model.x[opt]))
+    system, combo = best[0], ships_lookup[best]
 
     # Allocate infantry to ships in the selected combo
     source_systems = set()
     for ship in combo:
         if ship.capacity > 0:
             source_systems.add(ship.system)
-    print(f"Source systems: {", ".join([str(s._id) for s in source_systems])}")
+    logger.debug("Source systems: %s", Lazy(lambda: ", ".join(str(s._id) for s in source_systems)))
 
     infantry_available = []
     for s in source_systems:
@@ -159,16 +164,14 @@ def attack(player):
             infantry_allocated.extend(infantry_available[:infantry_to_load])
             infantry_available = infantry_available[infantry_to_load:]  # Remove allocated infantry
     for ships in combo:
-        print(f"{ships.name} is carrying {len(ships.in_cargo)} infantry units")
+        logger.debug("%s is carrying %d infantry units", ships.name, len(ships.in_cargo))
 
 
-    print("\nChosen attack:")
     # find the best attack option
-    best = max(attack_options, key=lambda opt: value(model.x[opt]))
-    system, combo = best
+    best = max(attack_options, key=lambda opt: pyo.value(model.x[opt]))
+    system, combo = best[0], ships_lookup[best]
     '''for (system, combo) in attack_options:
-        if value(model.x[(system, combo)]) > 0.5:'''
-    print(f"-> System: {system.coords}")
-    print(f"-> Ships: {[s.name for s in combo]}")  # Convert frozenset back to list
+        if pyo.value(model.x[(system, combo)]) > 0.5:'''
+    logger.debug("Chosen attack: system %s, ships %s", system.coords, Lazy(lambda: [s.name for s in combo]))
 
     return system, combo  # Return the chosen system and ship combo for further processing
@@ -0,0 +1,125 @@
+import numpy as np
+from collections import OrderedDict
+
+MAX_PLANET_FEATURES = 12
+PLANET_FEATURES = 6 # resources, influence, space dock, pds, ground forces, owner
+SHIP_TYPES = ["fighter", "carrier", "dreadnought", "cruiser", "destroyer", "warsun"]
+FEATURE_DIM = MAX_PLANET_FEATURES + len(SHIP_TYPES) + 1
+
+# the adjacency of the last MAX_GRAPHS map layouts, shared by every Map built
+# from them, the most recently used last
+MAX_GRAPHS = 32
+_graphs = OrderedDict() # map string -> (adjacency, normalized adjacency, edges, edge values)
+
+def static_graph(game_map, tiles, rows):
+    """
+    The adjacency, its normalized form D^(-1/2) (A + I) D^(-1/2) and the
+    normalized form's non-zero entries as an edge list, built once per map
+    layout. Maps with the same layout get the same read-only arrays, so
+    their states can share a batch without comparing matrices. Only the
+    last MAX_GRAPHS layouts are kept, a Map built from an older one gets
+    new arrays.
+    """
+    key = tuple(game_map.map_string)
+    if key in _graphs:
+        _graphs.move_to_end(key)
+    else:
+        adjacency = np.zeros((len(tiles), len(tiles)), dtype=np.float32)
+        for idx, tile in enumerate(tiles):
+            for neighbor in tile.neighbors:
+                adjacency[idx, rows[neighbor.coords]] = 1
+
+        adj_hat = adjacency + np.eye(len(tiles), dtype=np.float32)
+        d_inv_sqrt = 1 / np.sqrt(adj_hat.sum(axis=1))
+        normalized_adjacency = adj_hat * d_inv_sqrt[:, None] * d_inv_sqrt[None, :]
+
+        edges = np.argwhere(normalized_adjacency)
+        edge_values = normalized_adjacency[tuple(edges.T)]
+
+        for array in (adjacency, normalized_adjacency, edges, edge_values):
+            array.flags.writeable = False
+        _graphs[key] = (adjacency, normalized_adjacency, edges, edge_values)
+        if len(_graphs) > MAX_GRAPHS:
+            _graphs.popitem(last=False)
+    return _graphs[key]
+
+def get_edges(normalized_adjacency):
+    """
+    The (row, column) pairs and values of the non-zero entries of a
+    normalized adjacency matrix. Looked up for the matrices of the layouts
+    static_graph keeps, other matrices (e.g. ones that were pickled or of an
+    evicted layout) are scanned.
+    """
+    # the cache holds on to its matrices, so identity cannot match a new array
+    for _, cached, edges, edge_values in reversed(_graphs.values()):
+        if cached is normalized_adjacency:
+            return edges, edge_values
+    normalized_adjacency = np.asarray(normalized_adjacency, dtype=np.float32)
+    edges = np.argwhere(normalized_adjacency)
+    return edges, normalized_adjacency[tuple(edges.T)]
+
+def stack_edges(edge_lists):
+    """
+    Batches (edges, values) pairs, one per board, into the (batch, row,
+    column) indices and values of a batch x tiles x tiles sparse tensor
+    """
+    counts = [len(edges) for edges, _ in edge_lists]
+    batch = np.repeat(np.arange(len(edge_lists), dtype=np.int64), counts)
+    indices = np.concatenate([edges for edges, _ in edge_lists])
+    values = np.concatenate([values for _, values in edge_lists])
+    return np.column_stack([batch, indices]), values
+
+class BoardEncoder():
+    def __init__(self, game_map):
+        """
+        Encodes a map for the graph network. The parts that never change
+        (adjacency, its normalized form and edge list, see static_graph, and
+        the planets' resources and influence) are computed once, afterwards
+        only the rows of tiles whose version moved on since the last call
+        are rewritten.
+        """
+        self.tiles = list(game_map.tiles.values())
+        self.rows = {tile.coords: idx for idx, tile in enumerate(self.tiles)}
+        self.versions = [None] * len(self.tiles)
+
+        self.node_features = np.zeros((len(self.tiles), FEATURE_DIM), dtype=np.float32)
+        for idx, tile in enumerate(self.tiles):
+            for column, planet in self.planet_columns(tile):
+                self.node_features[idx, column] = planet.resources
+                self.node_features[idx, column + 1] = planet.influence
+
+        self.adjacency, self.normalized_adjacency, self.edges, self.edge_values = static_graph(game_map, self.tiles, self.rows)
+
+        self.ship_columns = {name: MAX_PLANET_FEATURES + i for i, name in enumerate(SHIP_TYPES)}
+        self.owner_column = FEATURE_DIM - 1
+
+    def planet_columns(self, tile):
+        """The first column of each planet that fits in the encoding"""
+        for i, planet in enumerate(tile.planets[:MAX_PLANET_FEATURES // PLANET_FEATURES]):
+            yield i * PLANET_FEATURES, planet
+
+    def encode_tile(self, idx, tile):
+        row = self.node_features[idx]
+        for column, planet in self.planet_columns(tile):
+            row[column + 2] = planet.has_space_dock
+            row[column + 3] = planet.num_pds
+            row[column + 4] = planet.num_ground_forces
+            row[column + 5] = planet.owner._id if planet.owner != None else -1
+
+        row[MAX_PLANET_FEATURES:] = 0
+        for ship in tile.space_area:
+            if ship.name in self.ship_columns:
+                row[self.ship_columns[ship.name]] += 1
+        row[self.owner_column] = tile.space_area[0].owner._id if len(tile.space_area) > 0 else -1
+
+    def encode(self):
+        """
+        Returns a copy of the node features and the shared normalized
+        adjacency matrix
+        """
+        for idx, tile in enumerate(self.tiles):
+            if tile.version != self.versions[idx]:
+                self.encode_tile(idx, tile)
+                self.versions[idx] = tile.version
+
+        return self.node_features.copy(), self.normalized_adjacency
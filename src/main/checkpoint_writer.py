@@ -0,0 +1,70 @@
+import os
+import queue
+import threading
+
+def atomic_write(path, write, binary=False):
+    """
+    Writes a file through write(f) to a temporary file next to it and
+    renames it into place, readers never see a partly written file. If
+    write fails, the temporary file is removed and path is left as it was.
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "wb" if binary else "w") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class CheckpointWriter():
+    def __init__(self, max_pending=2):
+        """
+        Writes checkpoints and stats on a background thread so training does
+        not wait on the disk. Jobs are callables that only touch data the
+        caller snapshotted for them, they run one at a time in order. Jobs
+        must not print, the solvers swap out sys.stdout while they run on
+        the training thread.
+
+        At most max_pending jobs wait in the queue, submitting more blocks
+        until the writer catches up, which bounds the memory the snapshots
+        take. An exception in a job is raised again by the next submit or
+        flush.
+        """
+        self.jobs = queue.Queue(maxsize=max_pending)
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name="checkpoint-writer", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+                if self.error is None:
+                    job()
+            except Exception as e:
+                self.error = e
+            finally:
+                self.jobs.task_done()
+
+    def raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def submit(self, job):
+        self.raise_error()
+        self.jobs.put(job)
+
+    def flush(self):
+        """Waits until every submitted job is written"""
+        self.jobs.join()
+        self.raise_error()
+
+    def close(self):
+        self.flush()
+        self.jobs.put(None)
+        self.thread.join()
@@ -1,20 +1,21 @@
 import json
 import sys
 import os
-import matplotlib.pyplot as plt
 import numpy as np
 from collections import defaultdict
 import copy
-import matplotlib.patches as patches
-from matplotlib.ticker import PercentFormatter
 
 # Add the parent directory to the sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from units.ship import Ship
+from registry import get_registry
+from utils import LazyModule
 
-with open("src/data/ships.json") as f:
-    ships = json.load(f)
+# only needed to draw the outcome graph
+plt = LazyModule("matplotlib.pyplot")
+
+ships = get_registry().ships
 
 def assign_hits(fleet, hits):
     """
@@ -2,6 +2,9 @@ from copy import deepcopy
 import random
 
 from units.unit_types import Fighter
+from log_writer import get_logger
+
+logger = get_logger(__name__)
 
 def assign_hits(fleet, hits):
     """
@@ -69,15 +72,15 @@ def simulate_space_combat(fleet_1, fleet_2, debug=False):
         fleet_1 = assign_hits(fleet_1, defender_hits)
 
         if debug and combat_round <= 3:  # Limit debug output
-            print(f"Round {combat_round}:")
-            print(f"Player 1 rolled {attacker_hits} hits")
-            print(f"Player 2 rolled {defender_hits} hits")
-            print("Player 1's fleet:")
+            logger.debug("Round %d:", combat_round)
+            logger.debug("Player 1 rolled %d hits", attacker_hits)
+            logger.debug("Player 2 rolled %d hits", defender_hits)
+            logger.debug("Player 1's fleet:")
             for ship in fleet_1:
-                print(f"\t{ship}")
-            print("Player 2's fleet:")
+                logger.debug("\t%s", ship)
+            logger.debug("Player 2's fleet:")
             for ship in fleet_2:
-                print(f"\t{ship}")
+                logger.debug("\t%s", ship)
 
     # Return winner and remaining fleets
     if fleet_1 and not fleet_2:
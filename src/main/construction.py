@@ -1,7 +1,9 @@
-from pyomo.environ import *
+from utils import LazyModule
 
 from reinforce import compute_vulnerability
 
+pyo = LazyModule("pyomo.environ")
+
 def construction(player):
     # === Input Data ===
     planets = player.planets
@@ -18,14 +20,14 @@ def construction(player):
     MAX_PDS_PER_PLANET = 2
 
     # === Pyomo Model ===
-    model = ConcreteModel()
+    model = pyo.ConcreteModel()
     planet_list = list(planets)
 
     # Binary decision variables
-    model.build_dock = Var(planet_list, domain=Binary)
-    model.build_pds = Var(planet_list, domain=Binary)
+    model.build_dock = pyo.Var(planet_list, domain=pyo.Binary)
+    model.build_pds = pyo.Var(planet_list, domain=pyo.Binary)
 
-    model.structure_limits = ConstraintList()
+    model.structure_limits = pyo.ConstraintList()
     for p in planet_list:
         if p.has_space_dock:
             # Already has a dock, can't add more
@@ -36,13 +38,13 @@ def construction(player):
 
     # === Constraints ===
     # Only one structure in total
-    model.one_structure = Constraint(
+    model.one_structure = pyo.Constraint(
         expr=sum(model.build_dock[p] for p in planet_list) + 
             sum(model.build_pds[p] for p in planet_list) == 1
     )
 
     # No planet can get both
-    model.mutual_exclusive = ConstraintList()
+    model.mutual_exclusive = pyo.ConstraintList()
     for p in planet_list:
         model.mutual_exclusive.add(model.build_dock[p] + model.build_pds[p] <= 1)
 
@@ -65,14 +67,14 @@ def construction(player):
 
         return total
 
-    model.objective = Objective(rule=utility, sense=maximize)
+    model.objective = pyo.Objective(rule=utility, sense=pyo.maximize)
 
     # === Solve ===
-    solver = SolverFactory('glpk')
+    solver = pyo.SolverFactory('glpk')
     result = solver.solve(model, tee=False)
 
     # Check solver status
-    if result.solver.status != SolverStatus.ok or result.solver.termination_condition != TerminationCondition.optimal:
+    if result.solver.status != pyo.SolverStatus.ok or result.solver.termination_condition != pyo.TerminationCondition.optimal:
         #print("Solver failed to find an optimal solution.")
         return "failed"
 
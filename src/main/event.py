@@ -3,6 +3,10 @@ from production import produce
 
 from units.ground_forces import GroundForce
 from units.unit_types import Fighter, Destroyer, Cruiser, Carrier, Dreadnought, WarSun
+from log import Record
+from log_writer import get_logger
+
+logger = get_logger(__name__)
 
 class Event():
     def __init__(self, player):
@@ -14,10 +18,10 @@ class Pass(Event):
 
     def execute(self):
         self.player.pass_turn()
-        return [self.__str__()]
+        return [self.record()]
 
-    def __str__(self):
-        return f"[SYSTEM] {self.player.name} passed"
+    def record(self):
+        return Record("pass", self.player.name)
 
 class TacticalAction(Event):
     def __init__(self, player, active_system, ships):
@@ -37,7 +41,7 @@ class TacticalAction(Event):
         out = []
         for component in self.components:
             component.execute()
-            out.append(str(component))
+            out.append(component.record())
         return out
 
 class Activation():
@@ -48,8 +52,8 @@ class Activation():
     def execute(self):
         self.player.activate(self.active_system)
 
-    def __str__(self):
-        return f"[ACTIVATION] {self.player.name} activated system {self.active_system._id}"
+    def record(self):
+        return Record("activation", self.player.name, self.active_system._id)
     
 class Movement():
     def __init__(self, ships, active_system, player):
@@ -62,10 +66,8 @@ class Movement():
         for ship in self.ships:
             ship.move_to_system(self.active_system)
 
-    def __str__(self):
-        if len(self.ships) == 0:
-            return f"[MOVEMENT] {self.player.name} skipped the movement step"
-        return f"[MOVEMENT] {self.player.name} moved {[x.name for x in self.ships]} into system {str(self.active_system._id)}"
+    def record(self):
+        return Record("movement", self.player.name, self.active_system._id, [x.name for x in self.ships])
     
 class SpaceCombat():
     def __init__(self, active_system, player):
@@ -91,10 +93,8 @@ class SpaceCombat():
             if ship not in fleet_1 and ship not in fleet_2:
                 ship.destroy()'''
 
-    def __str__(self):
-        if self.winner == None:
-            return f"[SPACE COMBAT] {self.player.name} skipped the space combat step"
-        return f"[SPACE COMBAT] {self.player.name} {'won' if self.winner == 1 else "lost"} the space combat in {str(self.active_system._id)}"
+    def record(self):
+        return Record("space combat", self.player.name, self.active_system._id, outcome=self.winner)
     
 class Invasion():
     def __init__(self, active_system, player):
@@ -168,10 +168,8 @@ class Invasion():
                     ship.add_to_cargo(available_soldiers.pop())
 
 
-    def __str__(self):
-        if self.success == []:
-            return f"[INVASION] {self.player.name} failed to invade any planets in {str(self.active_system._id)}"
-        return f"[INVASION] {self.player.name} successfully invaded {self.success} in {str(self.active_system._id)}"
+    def record(self):
+        return Record("invasion", self.player.name, self.active_system._id, self.success)
     
 class Production():
     def __init__(self, active_system, player):
@@ -226,15 +224,15 @@ class Production():
                 elif unit == "warsun":
                     create_and_place(WarSun)
                 else:
-                    print(f"Reject: {unit}")
+                    logger.warning("Reject: %s", unit)
 
 
             
 
             self.produced = units
 
-    def __str__(self):
-        return f"[PRODUCTION] {self.player.name} produced the following units: {self.produced}"
+    def record(self):
+        return Record("production", self.player.name, self.active_system._id, self.produced)
     
 
 class StrategicAction(Event):
@@ -1,4 +1,6 @@
-from pyomo.environ import *
+from utils import LazyModule
+
+pyo = LazyModule("pyomo.environ")
 
 def get_command_counters(player):
     # === Input Data ===
@@ -8,35 +10,35 @@ def get_command_counters(player):
     waste_aversion = player.disposition["resource wastefulness"]  # How much you dislike wasting resources
 
     # === Pyomo Model ===
-    model = ConcreteModel()
+    model = pyo.ConcreteModel()
 
     # Variables
-    model.exhaust = Var(planets, domain=Binary)
-    model.extra_ccs = Var(within=NonNegativeIntegers)
+    model.exhaust = pyo.Var(planets, domain=pyo.Binary)
+    model.extra_ccs = pyo.Var(within=pyo.NonNegativeIntegers)
     
     # Expressions
-    model.total_influence = Expression(
+    model.total_influence = pyo.Expression(
         rule=lambda m: sum(p.influence * m.exhaust[p] for p in planets)
     )
-    model.total_resources = Expression(
+    model.total_resources = pyo.Expression(
         rule=lambda m: sum(p.resources * m.exhaust[p] for p in planets)
     )
-    model.required_influence = Expression(rule=lambda m: m.extra_ccs * influence_per_cc)
-    model.resource_waste = Expression(rule=lambda m: m.total_resources)
+    model.required_influence = pyo.Expression(rule=lambda m: m.extra_ccs * influence_per_cc)
+    model.resource_waste = pyo.Expression(rule=lambda m: m.total_resources)
 
     # Constraints
-    model.influence_sufficient = Constraint(
+    model.influence_sufficient = pyo.Constraint(
         expr=model.total_influence >= model.required_influence
     )
   
     # Objective: Maximize CCs gained while minimizing wasted resources
-    model.objective = Objective(
+    model.objective = pyo.Objective(
         expr=model.extra_ccs - waste_aversion * model.resource_waste,
-        sense=maximize
+        sense=pyo.maximize
     )
 
     # Solve
-    solver = SolverFactory('glpk')
+    solver = pyo.SolverFactory('glpk')
     solver.solve(model)
 
     # Output
@@ -1,109 +1,123 @@
-import pygame
 import textwrap  # Import textwrap for wrapping text
+from collections import deque
 
 
+def render_movement(r):
+    if not r.units:
+        return f"[MOVEMENT] {r.actor} skipped the movement step"
+    return f"[MOVEMENT] {r.actor} moved {list(r.units)} into system {r.system}"
+
+def render_space_combat(r):
+    if r.outcome is None:
+        return f"[SPACE COMBAT] {r.actor} skipped the space combat step"
+    return f"[SPACE COMBAT] {r.actor} {'won' if r.outcome == 1 else 'lost'} the space combat in {r.system}"
+
+def render_invasion(r):
+    if not r.units:
+        return f"[INVASION] {r.actor} failed to invade any planets in {r.system}"
+    return f"[INVASION] {r.actor} successfully invaded {list(r.units)} in {r.system}"
+
+# how each kind of record reads in the log
+RENDERERS = {
+    "system": lambda r: f"[SYSTEM] {r.outcome}",
+    "pass": lambda r: f"[SYSTEM] {r.actor} passed",
+    "command counters": lambda r: f"{r.actor} purchased {r.outcome} command counters for a total gain of {r.outcome + 3}",
+    "structure": lambda r: f"{r.actor} placed a {r.units} on {r.outcome}",
+    "activation": lambda r: f"[ACTIVATION] {r.actor} activated system {r.system}",
+    "movement": render_movement,
+    "space combat": render_space_combat,
+    "invasion": render_invasion,
+    "production": lambda r: f"[PRODUCTION] {r.actor} produced the following units: {r.units}",
+}
+
+class Record():
+    __slots__ = ("kind", "actor", "system", "units", "outcome")
+
+    def __init__(self, kind, actor=None, system=None, units=None, outcome=None):
+        """
+        Something that happened in a game, kept as the values it happened
+        with. The text is only built by str(), when a view or a log handler
+        shows it, so headless games never format their events.
+
+        Attributes:
+            kind (str): What happened, a key of RENDERERS
+            actor (str): Name of the player it happened to
+            system (int): Id of the system it happened in
+            units: The ships, planets or units involved
+            outcome: The result, e.g. the winner of a combat
+        """
+        self.kind = kind
+        self.actor = actor
+        self.system = system
+        self.units = units
+        self.outcome = outcome
+
+    def __str__(self):
+        return RENDERERS[self.kind](self)
+
+    def __repr__(self):
+        return f"Record({self.kind!r}, {self.actor!r}, {self.system!r}, {self.units!r}, {self.outcome!r})"
+
 class EventLog:
-    def __init__(self, visible=True):
-        self.events = []
-
-        self.visible = visible
-        if self.visible:
-            self.gui_attributes()
-
-    def gui_attributes(self):
-        self.width, self.height = 540, 500
-        self.disp = pygame.Surface((self.width, self.height))
-        self.rect = self.disp.get_rect(topleft=(1040, 20))
-        self.background_color = (17, 21, 36)
-        self.text_color = (255, 255, 255)
-        self.scrollbar_color = (50, 50, 50)
-        self.scrollbar_handle_color = (100, 100, 100)
-        self.font = pygame.font.Font(None, 24)
-        self.title_font = pygame.font.Font(None, 32)
-
-       # Scrolling
-        self.scroll_offset = 0
-        self.line_height = 30
-        self.visible_lines = (self.height - 40) // self.line_height  # Adjusted for title
-        self.max_scroll = 0  # Updates dynamically
-        
-        # Scrollbar dimensions
-        self.scrollbar_width = 10
-        self.scrollbar_rect = pygame.Rect(
-            self.width - self.scrollbar_width, 
-            0, 
-            self.scrollbar_width, 
-            self.height
-        )
+    def __init__(self, wrap_width=52, max_events=1000):
+        """
+        Keeps the latest events of a game. Drawing is done by
+        log_view.EventLogView, so a log can be kept without pygame.
+
+        Attributes:
+            events (deque): The last max_events Records (or plain strings) in
+                the order they happened, older ones are dropped
+            wrap_width (int): Number of characters per line, chosen to fit
+                the width of the event log panel.
+            num_added (int): Events ever added, including the dropped and
+                cleared ones
+        """
+        self.events = deque(maxlen=max_events)
+        self.wrap_width = wrap_width
+        self.num_added = 0
+
+        # the wrapped lines of each event, None until it is first shown
+        self.wrapped = deque(maxlen=max_events)
 
     def clear(self):
         self.events.clear()
-    
-    def add_event(self, text):
-        """Add an event to the log, respecting newlines and wrapping long text."""
-        # Split the text into lines based on explicit newlines
-        lines = text.split("\n")
-        for line in lines:
-            # Wrap each line to fit within the log width
-            wrapped_lines = textwrap.wrap(line, width=(self.width - 20) // 10)  # Approximate character width
-            self.events.extend(wrapped_lines)
-
-        if self.visible:
-            self.max_scroll = max(0, len(self.events) - self.visible_lines)
-
-    def update(self):
-        """Update the display surface."""
-        if self.visible:
-            self.disp.fill(self.background_color)
-
-            # Render the title
-            title_surf = self.title_font.render("Event Log", True, (255, 215, 0))  # Gold color
-            self.disp.blit(title_surf, (self.width // 2 - title_surf.get_width() // 2, 5))
-
-            # Display event logs below the title
-            start_idx = self.scroll_offset
-            end_idx = min(start_idx + self.visible_lines, len(self.events))
-            for i, event in enumerate(self.events[start_idx:end_idx]):
-                text_surf = self.font.render(event, True, self.text_color)
-                self.disp.blit(text_surf, (10, i * self.line_height + 40))  # Adjusted for title space
-            
-            # Draw scrollbar if needed
-            if len(self.events) > self.visible_lines:
-                self._draw_scrollbar()
-    
-    def _draw_scrollbar(self):
-        """Draw the scrollbar on the display surface."""
-        # Draw scrollbar background
-        pygame.draw.rect(self.disp, self.scrollbar_color, self.scrollbar_rect)
-        
-        # Calculate scrollbar handle size and position
-        handle_height = max(30, (self.visible_lines / len(self.events)) * self.height)
-        handle_pos = (self.scroll_offset / self.max_scroll) * (self.height - handle_height)
-        
-        # Draw scrollbar handle
-        handle_rect = pygame.Rect(
-            self.width - self.scrollbar_width, 
-            handle_pos, 
-            self.scrollbar_width, 
-            handle_height
-        )
-        pygame.draw.rect(self.disp, self.scrollbar_handle_color, handle_rect)
-
-    def scroll(self, direction):
-        """Scroll up (-1) or down (+1)."""
-        self.scroll_offset = max(0, min(self.scroll_offset + direction, self.max_scroll))
-
-    def handle_mouse_wheel(self, pos, event):
-        """Handle mouse wheel scrolling."""
-        if self.is_mouse_over(pos):
-            # Scroll up or down based on mouse wheel direction
-            self.scroll(-event.y)
-
-    def is_mouse_over(self, mouse_pos):
-        """Check if mouse is over the event log area."""
-        return self.rect.collidepoint(mouse_pos)
-
-    def draw(self, screen):
-        """Draw the event log on the main screen."""
-        if self.visible:
-            screen.blit(self.disp, self.rect.topleft)
\ No newline at end of file
+        self.wrapped.clear()
+
+    def add_event(self, event):
+        """Add a Record or a line of text to the log, it is rendered when shown"""
+        self.events.append(event)
+        self.wrapped.append(None)
+        self.num_added += 1
+
+    def event_lines(self, index):
+        """
+        The wrapped lines of the event at index, rendered on first use,
+        respecting newlines and wrapping long text.
+        """
+        if (lines := self.wrapped[index]) is None:
+            lines = []
+            # Split the text into lines based on explicit newlines
+            for line in str(self.events[index]).split("\n"):
+                # Wrap each line to fit within the log width
+                lines.extend(textwrap.wrap(line, width=self.wrap_width))  # Approximate character width
+            self.wrapped[index] = lines
+        return lines
+
+    def lines(self, start=0, count=None):
+        """Up to count lines of text, from the event at index start on"""
+        out = []
+        for index in range(start, len(self.events)):
+            if count is not None and len(out) >= count:
+                break
+            out.extend(self.event_lines(index))
+        return out if count is None else out[:count]
+
+    def last_page(self, count):
+        """Index of the first event shown when the last count lines are in view"""
+        lines = 0
+        for index in range(len(self.events) - 1, -1, -1):
+            lines += len(self.event_lines(index))
+            if lines >= count:
+                # an event that only partly fits is scrolled past
+                return min(index + (lines > count), len(self.events) - 1)
+        return 0
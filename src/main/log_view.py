@@ -0,0 +1,111 @@
+import pygame
+
+
+class EventLogView:
+    def __init__(self, event_log):
+        """Draws an EventLog as a scrollable panel"""
+        self.event_log = event_log
+
+        self.width, self.height = 540, 500
+        self.disp = pygame.Surface((self.width, self.height))
+        self.rect = self.disp.get_rect(topleft=(1040, 20))
+        self.background_color = (17, 21, 36)
+        self.text_color = (255, 255, 255)
+        self.scrollbar_color = (50, 50, 50)
+        self.scrollbar_handle_color = (100, 100, 100)
+        self.font = pygame.font.Font(None, 24)
+        self.title_font = pygame.font.Font(None, 32)
+        self.title_surf = self.title_font.render("Event Log", True, (255, 215, 0))  # Gold color
+
+        # Rendered text of the lines in view, and what the panel last showed
+        self.surfaces = {}
+        self.drawn = None
+        self.dropped = 0
+
+       # Scrolling
+        self.scroll_offset = 0
+        self.line_height = 30
+        self.visible_lines = (self.height - 40) // self.line_height  # Adjusted for title
+        self.max_scroll = 0  # In events, updates dynamically
+
+        # Scrollbar dimensions
+        self.scrollbar_width = 10
+        self.scrollbar_rect = pygame.Rect(
+            self.width - self.scrollbar_width,
+            0,
+            self.scrollbar_width,
+            self.height
+        )
+
+    def update(self):
+        """Update the display surface, it is only redrawn when the log or the scroll position changed."""
+        log = self.event_log
+
+        # events dropped from the front of the log (or cleared) move the ones in view up
+        dropped = log.num_added - len(log.events)
+        self.scroll_offset = max(0, self.scroll_offset - (dropped - self.dropped))
+        self.dropped = dropped
+
+        self.max_scroll = log.last_page(self.visible_lines)
+        self.scroll_offset = min(self.scroll_offset, self.max_scroll)
+
+        state = (log.num_added, len(log.events), self.scroll_offset)
+        if state == self.drawn:
+            return
+        self.drawn = state
+
+        self.disp.fill(self.background_color)
+
+        # Render the title
+        self.disp.blit(self.title_surf, (self.width // 2 - self.title_surf.get_width() // 2, 5))
+
+        # Display event logs below the title, scrolling is by event and only
+        # the events in view are wrapped and rendered
+        surfaces = {}
+        for i, line in enumerate(log.lines(self.scroll_offset, self.visible_lines)):
+            if (text_surf := self.surfaces.get(line)) is None:
+                text_surf = self.font.render(line, True, self.text_color)
+            surfaces[line] = text_surf
+            self.disp.blit(text_surf, (10, i * self.line_height + 40))  # Adjusted for title space
+        self.surfaces = surfaces
+
+        # Draw scrollbar if needed
+        if self.max_scroll > 0:
+            self._draw_scrollbar()
+
+    def _draw_scrollbar(self):
+        """Draw the scrollbar on the display surface."""
+        # Draw scrollbar background
+        pygame.draw.rect(self.disp, self.scrollbar_color, self.scrollbar_rect)
+
+        # Calculate scrollbar handle size and position
+        num_events = len(self.event_log.events)
+        handle_height = max(30, ((num_events - self.max_scroll) / num_events) * self.height)
+        handle_pos = (self.scroll_offset / self.max_scroll) * (self.height - handle_height)
+
+        # Draw scrollbar handle
+        handle_rect = pygame.Rect(
+            self.width - self.scrollbar_width,
+            handle_pos,
+            self.scrollbar_width,
+            handle_height
+        )
+        pygame.draw.rect(self.disp, self.scrollbar_handle_color, handle_rect)
+
+    def scroll(self, direction):
+        """Scroll up (-1) or down (+1)."""
+        self.scroll_offset = max(0, min(self.scroll_offset + direction, self.max_scroll))
+
+    def handle_mouse_wheel(self, pos, event):
+        """Handle mouse wheel scrolling."""
+        if self.is_mouse_over(pos):
+            # Scroll up or down based on mouse wheel direction
+            self.scroll(-event.y)
+
+    def is_mouse_over(self, mouse_pos):
+        """Check if mouse is over the event log area."""
+        return self.rect.collidepoint(mouse_pos)
+
+    def draw(self, screen):
+        """Draw the event log on the main screen."""
+        screen.blit(self.disp, self.rect.topleft)
@@ -0,0 +1,106 @@
+import os
+import gzip
+import queue
+import atexit
+import shutil
+import logging
+import logging.handlers
+
+FORMAT = "[%(asctime)s] %(levelname)s %(name)s: %(message)s"
+
+# log every solve, they stay at WARNING unless LogWriter's levels name them
+LIBRARY_LEVELS = {"pyomo": "WARNING"}
+
+def get_logger(name):
+    """
+    The logger of a module, called with __name__. Messages take %-style
+    arguments, which are only formatted if the record is written, see Lazy.
+    Until a LogWriter is set up only warnings and errors reach stderr.
+    """
+    return logging.getLogger(name)
+
+class Lazy():
+    def __init__(self, compute):
+        """
+        A log argument that is only computed when the message is formatted,
+        for arguments that cost more than a reference, e.g.
+        logger.debug("Ships: %s", Lazy(lambda: [s.name for s in ships]))
+        """
+        self.compute = compute
+
+    def __str__(self):
+        return str(self.compute())
+
+def gzip_rotated(source, dest):
+    """Rotates a log file into a gzip file"""
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+class LogWriter():
+    def __init__(self, files, level="INFO", levels=None, max_bytes=50 * 2**20, backups=3, compress=False):
+        """
+        Writes log records to files on a background thread. Records below
+        their logger's level are dropped before their message is formatted,
+        the others are formatted where they are logged (the game objects in
+        them keep changing) and put on a queue, file writes and rotation
+        happen on the writer's thread.
+
+        Args:
+            files (dict): Log file path -> name of the logger whose records
+                go there (including its children), None for every record
+            level (str): Lowest level written
+            levels (dict): Levels for single modules, by logger name,
+                e.g. {"attack": "DEBUG"}
+            max_bytes (int): Size at which a file is rotated
+            backups (int): Rotated files kept per log file
+            compress (bool): Gzip rotated files
+        """
+        handlers = []
+        for path, name in files.items():
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, delay=True)
+            handler.setFormatter(logging.Formatter(FORMAT))
+            if name is not None:
+                handler.addFilter(logging.Filter(name))
+            if compress:
+                handler.namer = lambda name: name + ".gz"
+                handler.rotator = gzip_rotated
+            handlers.append(handler)
+
+        self.handlers = handlers
+        self.queue = queue.SimpleQueue()
+        self.queue_handler = logging.handlers.QueueHandler(self.queue)
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers)
+
+        levels = {**LIBRARY_LEVELS, **(levels or {})}
+        self.levels = {name: logging.getLogger(name).level for name in levels}
+        for name, module_level in levels.items():
+            logging.getLogger(name).setLevel(module_level)
+
+        root = logging.getLogger()
+        self.root_level = root.level
+        root.setLevel(level)
+        root.addHandler(self.queue_handler)
+
+        self.listener.start()
+        self.closed = False
+        atexit.register(self.close) # records still queued at exit are written
+
+    def close(self):
+        """Writes the records still queued and detaches from the loggers"""
+        if self.closed:
+            return
+        self.closed = True
+
+        root = logging.getLogger()
+        root.removeHandler(self.queue_handler)
+        root.setLevel(self.root_level)
+        for name, module_level in self.levels.items():
+            logging.getLogger(name).setLevel(module_level)
+
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+        atexit.unregister(self.close)
@@ -0,0 +1,257 @@
+import pygame
+import math
+
+from utils import round_cubic
+
+# tile images are loaded once per process and shared by every view
+TILE_IMAGES = {}
+
+def load_tile_image(_id):
+    if _id not in TILE_IMAGES:
+        TILE_IMAGES[_id] = pygame.image.load(f"src/data/tiles/ST_{_id}.png").convert_alpha()
+    return TILE_IMAGES[_id]
+
+class TileSprite():
+    def __init__(self, tile, scale=0.5, offset=(100,100), spacing=5):
+        """
+        Draws a hexagonal tile
+        """
+        self.q, self.r, self.s = tile.coords
+        self.coords = tile.coords
+
+        self.offset_x, self.offset_y = offset
+        self.scale = scale
+        self.spacing = spacing
+
+        self._id = tile._id
+        self.get_img()
+
+    def get_img(self):
+        self.orig_img = load_tile_image(self._id)
+
+        self.scale_img(self.scale)
+
+    def scale_img(self, factor):
+        self.img = pygame.transform.scale_by(self.orig_img, factor)
+        self.rect = self.img.get_rect()
+        self.width = self.rect.width//2 + self.spacing
+
+    def get_pixel_position(self):
+        x = self.width * (3./2 * self.q) - self.width//2
+        y = self.width * (math.sqrt(3)/2 * self.q  +  math.sqrt(3) * self.r) - self.width//2
+        return (x, y)
+
+    def get_zoomed_tile_position(self, pan_offset, center):
+        """
+        Calculate tile position considering zoom and pan
+        """
+
+        # Adjust hex grid calculation for zooming
+        x = self.width * (3./2 * self.q)
+        y = self.width * (math.sqrt(3)/2 * self.q + math.sqrt(3) * self.r)
+
+        # Center adjustment
+        zoomed_pos = (
+            x + center[0] - self.width//2,
+            y + center[1] - self.width//2
+        )
+
+        # Apply panning
+        pan_vec = pygame.Vector2(pan_offset)
+        final_pos = pygame.Vector2(zoomed_pos) + pan_vec
+
+        self.draw_pos = final_pos
+
+    def draw(self, screen):
+        #pygame.draw.circle(screen, (255,0,0), self.get_pixel_position(), self.width / 2)
+        screen.blit(self.img, self.draw_pos)
+
+class MapView():
+    def __init__(self, game_map, zoom_level=0.4):
+        """
+        Draws a Map and handles panning, zooming and hovering
+
+        Attributes:
+            game_map (Map): The board to draw
+        """
+        self.game_map = game_map
+
+        self.disp = pygame.surface.Surface((1000,850), pygame.SRCALPHA)
+        self.rect = self.disp.get_rect()
+        self.rect.topleft = [20,20] # offset
+        self.center = self.rect.center
+
+        self.background_color = (17, 21, 36)
+
+        self.base_scale = 0.4
+        self.spacing = 5
+        self.tile_size = 0
+
+        # Preload high-quality tiles
+        self.sprites = dict()
+        self.load_sprites()
+        self.get_tile_size()
+
+        # text hovering
+        self.hover_font = pygame.font.Font(None, 24)
+        self.hover_tile = None
+
+        # panning and zoom
+        self.is_panning = False
+        self.last_mouse_pos = (0,0)
+        self.max_pan_vertical = 800
+        self.max_pan_horizontal = 800
+        self.pan_offset = pygame.Vector2((0,0))
+
+        self.is_zoom = False
+        self.zoom_level = zoom_level
+        self.MIN_ZOOM = 0.4
+        self.MAX_ZOOM = 1.0
+
+    def set_map(self, game_map):
+        """Point the view at a different board"""
+        self.game_map = game_map
+        self.hover_tile = None
+        self.load_sprites()
+
+    def load_sprites(self):
+        self.sprites = {
+            coords: TileSprite(tile, scale=self.base_scale, offset=self.center, spacing=self.spacing)
+            for coords, tile in self.game_map.tiles.items()
+        }
+
+    def get_tile_size(self):
+        self.tile_size = self.sprites[(0,0,0)].rect.width // 2 + self.spacing
+
+    def pixel_to_tile(self, pos, pan_offset):
+        """
+        Convert pixel coordinates to hex coordinates with improved precision.
+
+        Args:
+            pos (tuple): Pixel coordinates
+            pan_offset (pygame.Vector2): Panning offset
+            zoom_level (float): Current zoom level
+
+        Returns:
+            Tile object or None
+        """
+        # Recalculate tile size based on current zoom
+        base_tile_size = self.sprites[(0,0,0)].width + self.sprites[(0,0,0)].spacing # Use the base tile width
+        scaled_tile_size = base_tile_size
+
+        # Adjust mouse position for panning and zooming
+        adjusted_pos = pygame.Vector2(pos) - pan_offset - pygame.Vector2(100 + self.rect.left,75+ self.rect.top)*self.zoom_level
+
+        # Translate to center-relative coordinates
+        center_relative_pos = adjusted_pos - pygame.Vector2(self.center)
+
+        # Precise hex coordinate conversion
+        # Twilight Imperium hex grid uses a specific coordinate system
+        x = center_relative_pos.x / scaled_tile_size
+        y = center_relative_pos.y / scaled_tile_size
+
+        # Cube coordinate conversion (for pointy-top hexes)
+        q = 2/3*x
+        r = (-1/3)*x + math.sqrt(3)/3*y
+
+        # Use the round_cubic function from utils to get the nearest hex
+        q, r, s = round_cubic(q, r, -(q+r))
+
+        # Check if the calculated coordinate exists in tiles
+        if (q, r, s) in self.game_map.tiles:
+            return self.game_map.tiles[(q, r, s)]
+
+        return None
+
+    def get_pixel_position(self, q, r, s):
+        x = self.tile_size * (3./2 * q) - self.tile_size//2
+        y = self.tile_size * (math.sqrt(3)/2 * q  +  math.sqrt(3) * r) - self.tile_size//2
+        return (x, y)
+
+    def update(self, pos):
+        self.do_pan(pos)
+        # Clear the display
+        self.disp.fill(self.background_color)  # Clear with transparent black
+
+        # Draw all the tiles with panning and zooming
+        for (q,r,s), sprite in self.sprites.items():
+            # Get the zoomed and panned position
+            sprite.get_zoomed_tile_position(self.pan_offset, self.center)
+
+            # Use high-quality original image and scale
+            sprite.scale_img(self.zoom_level)
+            sprite.draw(self.disp)
+
+        # Check for hover tile
+        if self.is_over(pos):
+            self.hover_tile = self.pixel_to_tile(pos, self.pan_offset)
+        else:
+            self.hover_tile = None
+
+    def draw(self, screen):
+        # Draw the surface to the screen
+        screen.blit(self.disp, self.rect.topleft)
+
+    def is_over(self, pos):
+        return self.rect.collidepoint(pos)
+
+    def draw_hover(self, screen, pos):
+        # Draw hover details if a tile is selected
+        if self.hover_tile:
+            #print(self.hover_tile)
+            # Render hover text
+            hover_text = str(self.hover_tile)
+
+            # Split the text into lines
+            text_lines = hover_text.split('\n')
+
+            # Render each line
+            text_surfaces = []
+            for line in text_lines:
+                text_surface = self.hover_font.render(line, True, (255, 255, 255))
+                text_surfaces.append(text_surface)
+
+            # Create a surface for the text box
+            max_width = max(surface.get_width() for surface in text_surfaces)
+            text_box_height = sum(surface.get_height() for surface in text_surfaces)
+
+            text_box = pygame.Surface((max_width + 20, text_box_height + 20), pygame.SRCALPHA)
+            text_box.fill((0, 0, 0, 180))  # Semi-transparent black background
+
+            # Blit text onto the text box
+            for i, surface in enumerate(text_surfaces):
+                text_box.blit(surface, (10, 10 + i * surface.get_height()))
+
+            # Position the text box near the mouse
+            text_box_pos = (pos[0] + 10, pos[1] + 10)
+            screen.blit(text_box, text_box_pos)
+
+    def start_pan(self, pos, event):
+        if event.button == 2 and self.is_over(pos):  # Middle mouse button
+            self.is_panning = True
+            self.last_mouse_pos = pygame.Vector2(event.pos)
+
+    def end_pan(self, event):
+        if event.button == 2:  # Middle mouse button
+            self.is_panning = False
+
+    def check_pan(self, pos):
+        if not self.is_over(pos):
+            self.is_panning = False
+
+    def do_pan(self, pos):
+        if self.is_panning and self.last_mouse_pos:
+            current_mouse_pos = pygame.Vector2(pos)
+            self.pan_offset += current_mouse_pos - self.last_mouse_pos
+
+            self.pan_offset[0] = max(min(self.pan_offset[0], self.max_pan_horizontal),
+                                -self.max_pan_horizontal)
+            self.pan_offset[1] = max(min(self.pan_offset[1], self.max_pan_vertical),
+                                -self.max_pan_vertical)
+
+            self.last_mouse_pos = current_mouse_pos
+
+    def zoom(self, pos, event):
+        if self.is_over(pos):
+            # Adjust zoom level
+            self.zoom_level = max(self.MIN_ZOOM, min(self.MAX_ZOOM, self.zoom_level + event.y * 0.1))
@@ -0,0 +1,231 @@
+import os
+import queue
+import random
+import traceback
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+from trainer import Trainer, create_models, create_players, distinct_models, random_starting_systems, summarize
+from vector_simulation import VectorSimulation
+from log_writer import LogWriter, get_logger
+
+logger = get_logger(__name__)
+
+class ActorError(RuntimeError):
+    """An actor process failed, raised by the learner"""
+
+class SharedWeights():
+    def __init__(self, shapes, version, name=None):
+        """
+        The weights and exploration rate of every model in one block of shared
+        memory. The learner publishes them, the actors pull the latest copy
+        whenever the version moves on.
+
+        Attributes:
+            shapes (list): The weight shapes of each model
+            version (multiprocessing.Value): Bumped on every publish, its lock
+                guards the buffer
+        """
+        self.shapes = shapes
+        self.version = version
+
+        # one epsilon per model after the weights
+        size = sum(int(np.prod(shape)) for model in shapes for shape in model) + len(shapes)
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=size * 4)
+        self.buffer = np.ndarray((size,), dtype=np.float32, buffer=self.shm.buf)
+
+    def __getstate__(self):
+        return self.shapes, self.version, self.shm.name
+
+    def __setstate__(self, state):
+        shapes, version, name = state
+        self.__init__(shapes, version, name=name)
+
+    def publish(self, models):
+        values = [w.ravel() for model in models for w in model.model.get_weights()]
+        values.append(np.array([model.epsilon for model in models]))
+        with self.version.get_lock():
+            self.buffer[:] = np.concatenate(values)
+            self.version.value += 1
+
+    def pull(self, models, version):
+        """
+        Loads the published weights into the models if they are newer than
+        version, returns the version the models now hold
+        """
+        if self.version.value == version:
+            return version
+
+        with self.version.get_lock():
+            values = self.buffer.copy()
+            version = self.version.value
+
+        offset = 0
+        for model, shapes in zip(models, self.shapes):
+            weights = []
+            for shape in shapes:
+                size = int(np.prod(shape))
+                weights.append(values[offset:offset + size].reshape(shape))
+                offset += size
+            model.model.set_weights(weights)
+        for model, epsilon in zip(models, values[offset:]):
+            model.epsilon = float(epsilon)
+        return version
+
+    def close(self, unlink=False):
+        del self.buffer
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+def run_actor(actor_id, weights, experience_queue, num_players, num_games, max_rounds, map_string, model_config, seed,
+              log_file):
+    """
+    Plays games forever with the latest published weights, sending the
+    experience and outcome of every batch of games to the learner. If it
+    fails, the traceback is sent instead as an ActorError. The models are
+    built from the learner's model_config, see create_models, so they take
+    its weights and run the same graph convolutions.
+    """
+    LogWriter({log_file: None})
+    random.seed(seed)
+    np.random.seed(seed)
+
+    try:
+        models = create_models(num_players, **model_config)
+        env = VectorSimulation(num_games, models, max_rounds=max_rounds, record=True, map_string=map_string)
+        players = [create_players(sim, models) for sim in env.games]
+
+        version = 0
+        while True:
+            version = weights.pull(distinct_models(models), version)
+
+            env.reset(players=players, starting_systems=random_starting_systems(env))
+            env.run()
+
+            summaries = [summarize(sim, env.victory_points, env.max_rounds) for sim in env.games]
+            experience_queue.put((actor_id, version, env.collect_experience(), summaries))
+    except Exception:
+        logger.exception("Actor %d failed", actor_id)
+        experience_queue.put(ActorError(f"Actor {actor_id} failed:\n{traceback.format_exc()}"))
+        raise
+
+def next_experience(experience_queue, actors, poll_every):
+    """
+    Waits for the next batch of experience from the actors, checking that
+    they are all still running with every batch and every poll_every
+    seconds without one. Raises an ActorError if an actor failed or its
+    process died, e.g. killed for running out of memory, instead of
+    waiting for it forever or carrying on without it.
+    """
+    while True:
+        try:
+            item = experience_queue.get(timeout=poll_every)
+        except queue.Empty:
+            item = None
+
+        if isinstance(item, ActorError):
+            raise item
+        for i, actor in enumerate(actors):
+            if not actor.is_alive():
+                raise ActorError(f"Actor {i} exited with code {actor.exitcode}, see actor_{i}.log")
+        if item is not None:
+            return item
+
+class ParallelTrainer(Trainer):
+    def __init__(self, num_actors=None, sync_every=5, poll_every=10.0, max_pending=None, **kwargs):
+        """
+        Trainer where self-play runs in separate actor processes and this
+        process only learns. The actors play num_games games in lockstep
+        each, the learner publishes its weights every sync_every episodes.
+        While it waits for experience, the learner checks every poll_every
+        seconds that the actors are still running.
+
+        At most max_pending batches of experience (one per actor by
+        default) wait for the learner, an actor that finishes another one
+        blocks until the learner catches up, which bounds the memory the
+        pickled experience takes.
+        """
+        super().__init__(headless=True, **kwargs)
+        self.num_actors = num_actors or max(1, os.cpu_count() - 1)
+        self.sync_every = sync_every
+        self.poll_every = poll_every
+        self.max_pending = max_pending or self.num_actors
+
+    def start_actors(self, ctx, weights, experience_queue):
+        actors = []
+        for i in range(self.num_actors):
+            actor = ctx.Process(
+                target=run_actor,
+                args=(i, weights, experience_queue, self.num_players, self.num_games,
+                      self.max_rounds, self.map_string, self.model_config, random.randrange(2**32),
+                      os.path.join(self.run_dir, f"actor_{i}.log")),
+                daemon=True
+            )
+            actor.start()
+            actors.append(actor)
+        return actors
+
+    def train(self):
+        """Run training loop"""
+        # TensorFlow does not survive a fork, actors start from a fresh interpreter
+        ctx = mp.get_context("spawn")
+        self.restore_rng()
+
+        shapes = [[w.shape for w in model.model.get_weights()] for model in self.networks]
+        weights = SharedWeights(shapes, ctx.Value("L", 0))
+        weights.publish(self.networks)
+
+        experience_queue = ctx.Queue(maxsize=self.max_pending)
+        actors = self.start_actors(ctx, weights, experience_queue)
+        self._log(f"Started {len(actors)} actors with {self.num_games} games each")
+
+        try:
+            while self.episode < self.episodes:
+                previous_episode = self.episode
+                actor_id, version, experience, summaries = next_experience(experience_queue, actors, self.poll_every)
+                self._log(f"Actor {actor_id} finished {len(summaries)} games with weights v{version} (latest v{weights.version.value})")
+
+                for model, transitions in zip(self.models, experience):
+                    for transition in transitions:
+                        model.remember(*transition)
+
+                for summary in summaries:
+                    self.episode += 1
+                    self.end_episode(self.episode, summary)
+
+                    if self.episode % self.sync_every == 0:
+                        weights.publish(self.networks)
+
+                # the actors' games in progress are not part of it, a resumed
+                # run starts them over
+                if self.checkpoint_due(previous_episode):
+                    self.save_checkpoint()
+        finally:
+            # games still in progress are discarded
+            for actor in actors:
+                actor.terminate()
+                actor.join()
+            weights.close(unlink=True)
+
+        # Save final models once the last checkpoint is on disk
+        self.writer.flush()
+        self.save_models("final")
+        self._log("Training complete!")
+        self.log_writer.close()
+
+def main():
+    """Main function to run parallel training"""
+    trainer = ParallelTrainer(
+        num_players=3,
+        episodes=500,
+        num_games=4,
+        models_dir="models",
+        logs_dir="logs"
+    )
+
+    trainer.train()
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import pygame, sys
+from copy import copy
 
 class Planet():
     def __init__(self, data, system):
@@ -12,6 +12,11 @@ class Planet():
         if self.name == "Mecatol Rex":
             self.points = 5
 
+        self.system = system # tile
+
+        self.reset()
+
+    def reset(self):
         # mutable characteristics
         self.has_space_dock = False
         self.num_pds = 0
@@ -19,11 +24,11 @@ class Planet():
         self.ground_forces = []
         self.owner = None # string
         self.is_ready = False
-
-        self.system = system # tile
+        self.system.touch()
 
     def change_ownership(self, player):
         self.owner = player
+        self.system.touch()
 
     def ready(self):
         self.is_ready = True
@@ -33,22 +38,33 @@ class Planet():
 
     def place_space_dock(self):
         self.has_space_dock = True
+        self.system.touch()
 
     def place_pds(self):
         self.num_pds += 1
+        self.system.touch()
 
     def place_ground_forces(self, infantry):
         self.num_ground_forces += 1
         self.ground_forces.append(infantry)
+        self.system.touch()
 
     def remove_ground_forces(self, infantry):
         self.num_ground_forces -= 1
         self.ground_forces = [x for x in self.ground_forces if x != infantry]
+        self.system.touch()
 
     def remove_n_ground_forces(self, n):
         self.num_ground_forces = max(0, self.num_ground_forces-1)
         for i in range(min(n, self.num_ground_forces)):
             self.ground_forces.pop()
+        self.system.touch()
+
+    def fork(self, system):
+        clone = copy(self)
+        clone.system = system
+        clone.ground_forces = []
+        return clone
 
     def get_encoding(self):
         """
@@ -1,27 +1,44 @@
 import json
+from copy import copy
 from utils import load_json
+from registry import get_disposition
 import random
 
 from attack import attack
 from reinforce import reinforce
 
-from ti4_model import TwilightImperiumRL
 from event import Leadership, Diplomacy, Construction, Warfare, TacticalAction, Pass
 from leadership import get_command_counters
 from construction import construction
 from production import produce
 
 from units import Carrier, Cruiser, Destroyer, Dreadnought, WarSun, Fighter, SpaceDock, GroundForce, Ship
+from log import Record
+from log_writer import get_logger, Lazy
+
+logger = get_logger(__name__)
 
 class Player:
     def __init__(self, name, _id, starting_system, starting_units=[], shared_model=None, disposition="base"):
         self.name = name
         self._id = _id
 
-        self.disposition = load_json(f"src/training/dispositions/{disposition}.json")
+        self.disposition_name = disposition
+        self.disposition = get_disposition(disposition)
+
+        if shared_model == None:
+            # TensorFlow is only imported once a player actually needs its own model
+            from ti4_model import TwilightImperiumRL
+            shared_model = TwilightImperiumRL()
+        self.model = shared_model
 
-        self.model = TwilightImperiumRL() if shared_model == None else shared_model
+        self.reset(starting_system, starting_units)
 
+    def reset(self, starting_system, starting_units=[]):
+        """
+        Puts the player back to the start of a game in the given home system,
+        keeping the model and disposition
+        """
         self.points = 0
         self.planets = []
         self.ships = []
@@ -35,7 +52,6 @@ class Player:
             self.add_planet(planet)
 
         self.initialize_units(starting_units, starting_system)
-        self.info = str(self)
 
         self.passed = False
         self.strategy_card = None
@@ -55,6 +71,22 @@ class Player:
             elif isinstance(unit, GroundForce):
                 unit.move_to_planet(self.planets[0])
 
+    def fork(self):
+        """
+        Returns a copy of the player that shares the model and disposition.
+        Planets, ships and command counters are filled in by a snapshot restore.
+        """
+        clone = copy(self)
+        clone.planets = []
+        clone.ships = []
+        clone.command_counters = dict(self.command_counters)
+        return clone
+
+    @property
+    def info(self):
+        """The player summary shown by the PlayerTracker, built when it is read"""
+        return str(self)
+
     def get_encoding(self):
         out = [self.points,
                self.command_counters["tactic"], 
@@ -76,8 +108,8 @@ class Player:
                 planet.exhaust()
 
             self.gain_command_counters(n_purchased + 3)
-            out.append(f"{self.name} purchased {n_purchased} command counters for a total gain of {n_purchased+3}")
-            print(f"{self.name} purchased {n_purchased} command counters for a total gain of {n_purchased+3}")
+            out.append(Record("command counters", self.name, outcome=n_purchased))
+            logger.debug("%s", out[-1])
 
 
             
@@ -86,50 +118,64 @@ class Player:
                 unit, planet = res
                 if unit == "pds":
                     planet.place_pds()
-                    out.append(f"{self.name} placed a PDS on {planet.name}")
-                    print(f"{self.name} placed a PDS on {planet.name}")
+                    out.append(Record("structure", self.name, units="PDS", outcome=planet.name))
+                    logger.debug("%s", out[-1])
 
                 elif unit == "space dock":
                     planet.place_space_dock()
-                    out.append(f"{self.name} placed a space dock on {planet.name}")
-                    f"{self.name} placed a space dock on {planet.name}"
+                    out.append(Record("structure", self.name, units="space dock", outcome=planet.name))
+                    logger.debug("%s", out[-1])
             else:
-                print(f"{self.name} attempted to build a structure, but could not")
+                logger.debug("%s attempted to build a structure, but could not", self.name)
 
             return out
 
 
+        # no decisions made in the status phase
+        decision = self.model.choose_action(state=self.get_state(game_map, phase), 
+                                            valid_actions=valid_actions)          
+        return self.act(decision, phase)
+
+    def get_state(self, game_map, phase="action"):
+        """
+        Returns the (node features, adjacency, player features) the model
+        decides on
+        """
         features, adjacency = game_map.encode_board_state()
         player_inputs = self.get_encoding()
         player_inputs.extend([
             phase == "strategy",
             phase == "action",
         ])
-
-
-        # no decisions made in the status phase
-        decision = self.model.choose_action(state=(features, adjacency, player_inputs), 
-                                            valid_actions=valid_actions)          
+        # a model shared by every seat needs to know whose decision it is,
+        # the disposition is already part of the encoding
+        player_inputs.extend(seat == self._id for seat in range(self.model.num_seats))
+        return features, adjacency, player_inputs
+
+    def act(self, decision, phase="action"):
+        """
+        Turns the model's action priorities into an action
+        """
         if phase == "action":
-            print(f"{self.name} Action priorities: {decision}")
+            logger.debug("%s Action priorities: %s", self.name, decision)
             return self.tactical_model(decision)
 
         return decision
 
     def tactical_model(self, decisions):
         if len(decisions) == 0 or self.command_counters["tactic"] == 0:
-            print(f"{self.name} passed")
+            logger.debug("%s passed", self.name)
             return Pass(self)
         
         action = decisions.pop(0)
         if action == "attack":
             if (res := attack(self)) == "failed":
                 # the action failed, perform the next one
-                print(f"{self.name} had no viable targets to attack")
+                logger.debug("%s had no viable targets to attack", self.name)
                 return self.tactical_model(decisions)
                 
             system, ships = res
-            print(f"{self.name} attacked {system._id} with {[s.name for s in ships]}")
+            logger.debug("%s attacked %s with %s", self.name, system._id, Lazy(lambda: [s.name for s in ships]))
 
             return TacticalAction(self, system, ships)
 
@@ -139,13 +185,13 @@ class Player:
                 return self.tactical_model(decisions)
                 
             system, ships = res
-            print(f"{self.name} reinforced {system._id} with {[s.name for s in ships]}")
+            logger.debug("%s reinforced %s with %s", self.name, system._id, Lazy(lambda: [s.name for s in ships]))
 
             return TacticalAction(self, system, ships)
         
         elif action == "produce":
             if (system_to_use := self.select_production_system()) == "failed":
-                print(f"{self.name} attempted to produce, but failed")
+                logger.debug("%s attempted to produce, but failed", self.name)
                 return self.tactical_model(decisions)
             
             return TacticalAction(self, system_to_use, [])
@@ -162,8 +208,6 @@ class Player:
         self.command_counters["tactic"] -= 1
         system.activate(self)
 
-        self.info = str(self)
-
     def get_readied_planets(self):
         return [p for p in self.planets if p.is_ready]
 
@@ -171,14 +215,10 @@ class Player:
         self.planets.append(planet)
         planet.change_ownership(self)
 
-        self.info = str(self)
-
     def lose_planet(self, planet):
         if planet in self.planets:
             self.planets.remove(planet)
 
-        self.info = str(self)
-
     def select_production_system(self):
         candidate_systems = set()
         for planet in self.planets:
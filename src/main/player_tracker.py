@@ -59,13 +59,13 @@ class PlayerTracker:
 
         # Draw scrollbar if needed
         if len(player_info_lines) > self.visible_lines:
-            self._draw_scrollbar()
+            self._draw_scrollbar(len(player_info_lines))
 
-    def _draw_scrollbar(self):
-        """Draw the scrollbar on the display surface."""
+    def _draw_scrollbar(self, num_lines):
+        """Draw the scrollbar for num_lines of player information on the display surface."""
         pygame.draw.rect(self.disp, self.scrollbar_color, (self.width - 10, 0, 10, self.height))
 
-        handle_height = max(30, (self.visible_lines / len(self.current_player.info.split("\n"))) * self.height)
+        handle_height = max(30, (self.visible_lines / num_lines) * self.height)
         handle_pos = (self.scroll_offset / self.max_scroll) * (self.height - handle_height)
 
         pygame.draw.rect(self.disp, self.scrollbar_handle_color, 
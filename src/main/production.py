@@ -1,5 +1,7 @@
-import pyomo.environ as pyo
 from units import Carrier, Cruiser, Destroyer, Dreadnought, WarSun, Fighter, GroundForce, Ship
+from utils import LazyModule
+
+pyo = LazyModule("pyomo.environ")
 
 def produce(player, system):
     # Create model
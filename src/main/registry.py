@@ -0,0 +1,158 @@
+import os
+import json
+import marshal
+from types import MappingProxyType
+
+TILE_DATA_PATH = "src/data/tile_data.json"
+SHIPS_PATH = "src/data/ships.json"
+DISPOSITIONS_DIR = "src/training/dispositions"
+
+# optional precompiled copy of all the data files, see build_cache
+CACHE_PATH = "src/data/registry_cache.bin"
+CACHE_VERSION = 1
+
+REQUIRED_TILE_KEYS = ("wormhole", "planets")
+REQUIRED_PLANET_KEYS = ("name", "resources", "influence")
+REQUIRED_SHIP_KEYS = ("name", "cost", "combat", "movement", "capacity", "sustain")
+
+def freeze(value):
+    """
+    Recursively turns dicts into read-only mappings and lists into tuples
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def source_files():
+    """
+    Returns every data file the registry is built from
+    """
+    dispositions = sorted(
+        os.path.join(DISPOSITIONS_DIR, name) for name in os.listdir(DISPOSITIONS_DIR)
+        if name.endswith(".json")
+    )
+    return [TILE_DATA_PATH, SHIPS_PATH] + dispositions
+
+def source_stamp():
+    return [(path, os.path.getmtime(path)) for path in source_files()]
+
+def read_sources():
+    """
+    Parses the data files into plain dicts
+    """
+    with open(TILE_DATA_PATH, "r") as f:
+        tiles = json.load(f)
+    with open(SHIPS_PATH, "r") as f:
+        ships = json.load(f)
+
+    dispositions = {}
+    for path in source_files()[2:]:
+        with open(path, "r") as f:
+            dispositions[os.path.basename(path)[:-len(".json")]] = json.load(f)
+
+    return {"tiles": tiles, "ships": ships, "dispositions": dispositions}
+
+def validate(data):
+    """
+    Raises a ValueError describing the first malformed entry
+    """
+    for _id, tile in data["tiles"].items():
+        for key in REQUIRED_TILE_KEYS:
+            if key not in tile:
+                raise ValueError(f"Tile {_id} in {TILE_DATA_PATH} is missing '{key}'")
+        for planet in tile["planets"]:
+            for key in REQUIRED_PLANET_KEYS:
+                if key not in planet:
+                    raise ValueError(f"A planet of tile {_id} in {TILE_DATA_PATH} is missing '{key}'")
+
+    for name, ship in data["ships"].items():
+        for key in REQUIRED_SHIP_KEYS:
+            if key not in ship:
+                raise ValueError(f"Ship {name} in {SHIPS_PATH} is missing '{key}'")
+
+    # every disposition must weigh the same things as the base one
+    expected = set(data["dispositions"]["base"])
+    for name, disposition in data["dispositions"].items():
+        if set(disposition) != expected:
+            missing = sorted(expected - set(disposition))
+            extra = sorted(set(disposition) - expected)
+            raise ValueError(f"Disposition {name} does not match base.json (missing {missing}, unexpected {extra})")
+
+def build_cache(path=CACHE_PATH):
+    """
+    Precompiles the data files into a single binary file. It is ignored once
+    any of the source files changes.
+    """
+    data = read_sources()
+    validate(data)
+    with open(path, "wb") as f:
+        marshal.dump({"version": CACHE_VERSION, "stamp": source_stamp(), "data": data}, f)
+
+def read_cache(path):
+    """
+    Returns the cached data, or None if the cache is missing or stale
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            cache = marshal.load(f)
+    except (EOFError, ValueError, TypeError):
+        return None
+    if cache.get("version") != CACHE_VERSION or cache.get("stamp") != source_stamp():
+        return None
+    return cache["data"]
+
+class DataRegistry():
+    """
+    Immutable, validated view of the static game data: tile specs by id,
+    ship specs by name and dispositions by name.
+    """
+    def __init__(self, cache_path=CACHE_PATH):
+        data = read_cache(cache_path) if cache_path is not None else None
+        if data is None:
+            data = read_sources()
+            validate(data)
+
+        self.tiles = freeze({int(_id): tile for _id, tile in data["tiles"].items()})
+        self.ships = freeze(data["ships"])
+        self.dispositions = freeze(data["dispositions"])
+
+    def get_tile_spec(self, _id):
+        if (_id := int(_id)) not in self.tiles:
+            raise KeyError(f"Unknown tile id {_id}")
+        return self.tiles[_id]
+
+    def get_ship_spec(self, name):
+        if name not in self.ships:
+            raise KeyError(f"Unknown ship {name}")
+        return self.ships[name]
+
+    def get_disposition(self, name):
+        if name not in self.dispositions:
+            raise KeyError(f"Unknown disposition {name}, expected one of {sorted(self.dispositions)}")
+        return self.dispositions[name]
+
+# the data is loaded once per process
+REGISTRY = None
+
+def get_registry():
+    global REGISTRY
+    if REGISTRY is None:
+        REGISTRY = DataRegistry()
+    return REGISTRY
+
+def get_tile_spec(_id):
+    return get_registry().get_tile_spec(_id)
+
+def get_ship_spec(name):
+    return get_registry().get_ship_spec(name)
+
+def get_disposition(name):
+    return get_registry().get_disposition(name)
+
+if __name__ == "__main__":
+    build_cache()
+    print(f"Wrote {CACHE_PATH} from {len(source_files())} data files")
@@ -1,5 +1,8 @@
-from pyomo.environ import *
-from utils import powerset, calculate_fleet_value
+from utils import LazyModule, powerset, calculate_fleet_value
+from log_writer import get_logger, Lazy
+
+pyo = LazyModule("pyomo.environ")
+logger = get_logger(__name__)
 
 def compute_vulnerability(system, player):
     # Heuristic: vulnerability = enemy proximity + lack of defense
@@ -12,10 +15,10 @@ def compute_vulnerability(system, player):
 def filter_reinforce_targets(player):
     vulnerable_systems = {}
     controlled_systems = set([planet.system for planet in player.planets])
-    print(f"Controlled systems: {controlled_systems}")
+    logger.debug("Controlled systems: %s", controlled_systems)
     for system in controlled_systems:
         vuln_score = compute_vulnerability(system, player)
-        print(f"System {system.coords} vulnerability score: {vuln_score}")
+        logger.debug("System %s vulnerability score: %s", system.coords, vuln_score)
         
         vulnerable_systems[system] = vuln_score
     return vulnerable_systems
@@ -23,7 +26,7 @@ def filter_reinforce_targets(player):
 def reachable_ships_for_reinforcement(player):
     reachable = dict()
     controlled_systems = set([planet.system for planet in player.planets])
-    print(f"Controlled systems: {controlled_systems}")
+    logger.debug("Controlled systems: %s", controlled_systems)
     for ship in player.ships:
         if player.name not in ship.system.command_counters: 
             for tile in ship.get_reachable_tiles():
@@ -77,6 +80,7 @@ def reinforce(player):
     reinforce_options = []
     benefit_lookup = {}
     cost_lookup = {}
+    ships_lookup = {}
 
     for system in reinforce_targets:
         vuln_score = reinforce_targets[system]
@@ -93,25 +97,26 @@ def reinforce(player):
 
             key = (system, frozenset(combo))
             reinforce_options.append(key)
+            ships_lookup[key] = combo # a frozenset's order changes between runs
             benefit_lookup[key] = vuln_score
             cost_lookup[key] = calculate_fleet_value(combo, player.disposition)
 
     # Optimization model
-    model = ConcreteModel()
-    model.x = Var(reinforce_options, domain=Binary)
+    model = pyo.ConcreteModel()
+    model.x = pyo.Var(reinforce_options, domain=pyo.Binary)
 
     def obj_rule(m):
         return sum(
             m.x[opt] * (benefit_lookup[opt] - 0.5 * cost_lookup[opt])  # Adjust 0.5 as desired
             for opt in reinforce_options
         )
-    model.obj = Objective(rule=obj_rule, sense=maximize)
+    model.obj = pyo.Objective(rule=obj_rule, sense=pyo.maximize)
 
     # Only one reinforcement choice
     if reinforce_options:
-        model.reinforce_once = Constraint(expr=sum(model.x[opt] for opt in reinforce_options) <= 1)
+        model.reinforce_once = pyo.Constraint(expr=sum(model.x[opt] for opt in reinforce_options) <= 1)
     else:
-        model.reinforce_once = Constraint(expr=Constraint.Feasible)  # No options, so the constraint is trivially feasible
+        model.reinforce_once = pyo.Constraint(expr=pyo.Constraint.Feasible)  # No options, so the constraint is trivially feasible
 
     def fleet_limit(m):
         return sum(
@@ -119,17 +124,15 @@ def reinforce(player):
             for opt in reinforce_options
         ) <= player.command_counters["fleet"]
 
-    model.fleet_constraint = Constraint(rule=fleet_limit)
+    model.fleet_constraint = pyo.Constraint(rule=fleet_limit)
 
-    SolverFactory('glpk').solve(model)
+    pyo.SolverFactory('glpk').solve(model)
 
     if len(reinforce_options) == 0:
         return None, None
 
-    best = max(reinforce_options, key=lambda opt: value(model.x[opt]))
-    system, combo = best
-    print("\nChosen reinforcement:")
-    print(f"-> System: {system.coords}")
-    print(f"-> Ships: {list(combo)}")
+    best = max(reinforce_options, key=lambda opt: pyo.value(model.x[opt]))
+    system, combo = best[0], ships_lookup[best]
+    logger.debug("Chosen reinforcement: system %s, ships %s", system.coords, Lazy(lambda: list(combo)))
 
     return system, combo
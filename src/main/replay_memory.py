@@ -0,0 +1,486 @@
+import random
+import numpy as np
+from collections import OrderedDict
+
+from board_encoder import get_edges, stack_edges
+
+class GraphStore():
+    def __init__(self):
+        """
+        Adjacency matrices are static for a map, so each distinct one is
+        stored once, with its edge list, and everything else only keeps its
+        index. Batches come out dense (adjacency_batch) or as the edges of
+        every graph in the batch (edge_batch).
+        """
+        self.graphs = np.zeros((0, 0, 0), dtype=np.float32)
+        self.edges = [] # (edges, values) of each graph, see board_encoder.get_edges
+        self.graph_ids = dict() # adjacency bytes -> index into graphs
+        self.last_graph = (None, None) # Map.get_adjacency hands out the same array every time
+
+    def get_graph_id(self, adjacency):
+        """Returns the index of the adjacency matrix, storing it if it is new"""
+        if adjacency is self.last_graph[0]:
+            return self.last_graph[1]
+
+        original = adjacency
+        adjacency = np.asarray(adjacency, dtype=np.float32)
+        key = adjacency.tobytes()
+        if key not in self.graph_ids:
+            self.graph_ids[key] = len(self.graphs)
+            self.graphs = np.concatenate([self.graphs.reshape(-1, *adjacency.shape), adjacency[None]])
+            self.edges.append(get_edges(original))
+        self.last_graph = (original, self.graph_ids[key])
+        return self.graph_ids[key]
+
+    def load_graphs(self, graphs):
+        self.graphs = graphs
+        self.edges = [get_edges(graph) for graph in self.graphs]
+        self.graph_ids = {graph.tobytes(): i for i, graph in enumerate(self.graphs)}
+        self.last_graph = (None, None)
+
+    def adjacency_batch(self, graph_ids):
+        """The adjacency matrices of graph_ids stacked, batch x tiles x tiles"""
+        return self.graphs[graph_ids]
+
+    def edge_batch(self, graph_ids):
+        """
+        The non-zero entries of adjacency_batch(graph_ids) without building
+        it: (batch, row, column) indices in row major order and their values
+        """
+        return stack_edges([self.edges[graph_id] for graph_id in graph_ids])
+
+class ReplayMemory(GraphStore):
+    def __init__(self, capacity=10000):
+        """
+        Fixed size experience memory backed by preallocated float32 arrays.
+        Once full, the oldest transition is overwritten.
+
+        The arrays are allocated on the first insert, when the board size is
+        known. Transitions only keep the index of their adjacency matrix, see
+        GraphStore. A transition's state and next state are always on the
+        same board.
+        """
+        super().__init__()
+        self.capacity = capacity
+        self.size = 0
+        self.position = 0
+        self.allocated = False
+
+    def allocate(self, state):
+        node_features, adjacency, player_features = state
+        self.node_features = np.zeros((self.capacity, *np.shape(node_features)), dtype=np.float32)
+        self.graph = np.zeros(self.capacity, dtype=np.int32)
+        self.player_features = np.zeros((self.capacity, len(player_features)), dtype=np.float32)
+
+        self.next_node_features = np.zeros_like(self.node_features)
+        self.next_player_features = np.zeros_like(self.player_features)
+
+        self.actions = np.zeros(self.capacity, dtype=np.int64)
+        self.rewards = np.zeros(self.capacity, dtype=np.float32)
+        self.dones = np.zeros(self.capacity, dtype=np.float32)
+        self.allocated = True
+
+    def add(self, state, action, reward, next_state, done):
+        if not self.allocated:
+            self.allocate(state)
+
+        i = self.position
+        self.node_features[i], adjacency, self.player_features[i] = state
+        self.next_node_features[i], _, self.next_player_features[i] = next_state
+        self.graph[i] = self.get_graph_id(adjacency)
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.dones[i] = done
+
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """
+        Draws batch_size distinct transitions, uniformly
+
+        Returns:
+            states (list): Batched [node_features, graph ids, player_features],
+                the ids of the transitions' adjacency matrices, see
+                GraphStore.adjacency_batch and edge_batch
+            actions, rewards, dones (np.ndarray): One entry per transition
+            next_states (list): Batched next states, like states
+            indices (np.ndarray): Where the transitions are stored, see update_priorities
+            weights (np.ndarray): Importance sampling weight of each transition, all 1
+        """
+        indices = np.array(random.sample(range(self.size), batch_size))
+        return (*self.gather(indices), indices, np.ones(batch_size, dtype=np.float32))
+
+    def gather(self, indices):
+        """The (states, actions, rewards, next_states, dones) stored at indices"""
+        graph = self.graph[indices]
+        return (
+            [self.node_features[indices], graph, self.player_features[indices]],
+            self.actions[indices],
+            self.rewards[indices],
+            [self.next_node_features[indices], graph, self.next_player_features[indices]],
+            self.dones[indices],
+        )
+
+    def update_priorities(self, indices, errors):
+        """Uniform sampling has no priorities, see PrioritizedReplayMemory"""
+        pass
+
+    # the per transition arrays, in the order they are saved
+    FIELDS = ["node_features", "graph", "player_features", "next_node_features",
+              "next_player_features", "actions", "rewards", "dones"]
+
+    def snapshot(self):
+        """
+        Copies of the filled part of the arrays and the write position, so
+        a memory loaded from them overwrites and samples exactly like this one
+        """
+        arrays = {"position": self.position, "graphs": self.graphs.copy()}
+        if self.allocated:
+            arrays.update({field: getattr(self, field)[:self.size].copy() for field in self.FIELDS})
+        return arrays
+
+    def save(self, path):
+        """Writes the stored transitions to a compressed .npz file, see snapshot"""
+        np.savez_compressed(path, **self.snapshot())
+
+    def load(self, path):
+        """Replaces the contents with a memory written by save"""
+        with np.load(path) as data:
+            self.load_graphs(data["graphs"])
+
+            self.size = len(data["actions"]) if "actions" in data else 0
+            if self.size > self.capacity:
+                raise ValueError(f"Saved memory holds {self.size} transitions, more than the capacity of {self.capacity}")
+            self.position = int(data["position"])
+
+            self.allocated = False
+            if self.size > 0:
+                self.allocate(self.saved_state(data))
+                for field in self.FIELDS:
+                    getattr(self, field)[:self.size] = data[field]
+
+    def saved_state(self, data):
+        """A state shaped like the saved ones, to allocate the arrays for them"""
+        return data["node_features"][0], None, data["player_features"][0]
+
+    def __len__(self):
+        return self.size
+
+class SumTree():
+    def __init__(self, capacity):
+        """
+        Binary tree over capacity priorities where every node holds the sum
+        of its children, stored as an array: the root is at 1, the children
+        of node i at 2i and 2i + 1 and the leaves from self.leaves on.
+        Updates and prefix sum searches take O(log n).
+        """
+        self.leaves = 1
+        while self.leaves < capacity:
+            self.leaves *= 2
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def get(self, indices):
+        return self.tree[np.asarray(indices) + self.leaves]
+
+    def set(self, index, priority):
+        """update for a single leaf, without the array overhead"""
+        node = index + self.leaves
+        self.tree[node] = priority
+        node //= 2
+        while node >= 1:
+            self.tree[node] = self.tree[2 * node] + self.tree[2 * node + 1]
+            node //= 2
+
+    def update(self, indices, priorities):
+        """Sets the priorities of the leaves at indices and their ancestors' sums"""
+        nodes = np.asarray(indices) + self.leaves
+        self.tree[nodes] = priorities
+
+        # every leaf is at the same depth, so are all nodes of a level
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        """
+        Returns, for each value in [0, total), the leaf whose span of the
+        cumulative priorities contains it. All values descend together.
+        """
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+        while nodes[0] < self.leaves:
+            left = 2 * nodes
+            # rounding can leave a value past the last non-empty leaf
+            go_right = (values >= self.tree[left]) & (self.tree[left + 1] > 0)
+            values = np.where(go_right, values - self.tree[left], values)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - self.leaves
+
+class PrioritizedReplayMemory(ReplayMemory):
+    def __init__(self, capacity=10000, alpha=0.6, beta=0.4, beta_increment=0.001, min_priority=1e-3):
+        """
+        Replay memory that samples transitions in proportion to their last
+        TD error (prioritized experience replay). New transitions get the
+        highest priority seen so far, so each is replayed at least once.
+
+        Attributes:
+            alpha (float): How strongly priorities skew sampling, 0 is uniform
+            beta (float): Importance sampling correction, grows by
+                beta_increment every sample until it reaches 1
+            min_priority (float): Added to every error so no transition
+                stops being sampled
+        """
+        super().__init__(capacity)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.min_priority = min_priority
+
+        self.priorities = SumTree(capacity)
+        self.max_priority = 1.0
+
+    def add(self, state, action, reward, next_state, done):
+        position = self.position
+        super().add(state, action, reward, next_state, done)
+        self.priorities.set(position, self.max_priority)
+
+    def sample(self, batch_size):
+        """
+        Draws batch_size transitions in proportion to their priority, one
+        from each of batch_size equal spans of the total, see
+        ReplayMemory.sample. The weights undo the bias that puts into the
+        gradients, scaled so the largest is 1.
+        """
+        span = self.priorities.total / batch_size
+        values = (np.arange(batch_size) + np.random.rand(batch_size)) * span
+        indices = self.priorities.find(values)
+
+        probabilities = self.priorities.get(indices) / self.priorities.total
+        weights = (self.size * probabilities) ** -self.beta
+        weights = (weights / weights.max()).astype(np.float32)
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        return (*self.gather(indices), indices, weights)
+
+    def update_priorities(self, indices, errors):
+        """Sets the priorities of sampled transitions from their TD errors"""
+        priorities = (np.abs(errors) + self.min_priority) ** self.alpha
+        self.priorities.update(indices, priorities)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+
+    def snapshot(self):
+        arrays = super().snapshot()
+        arrays.update({
+            "priorities": self.priorities.get(np.arange(self.size)),
+            "max_priority": self.max_priority,
+            "beta": self.beta,
+        })
+        return arrays
+
+    def load(self, path):
+        super().load(path)
+        self.priorities = SumTree(self.capacity)
+        with np.load(path) as data:
+            if "priorities" not in data:
+                # saved by a uniform memory, every transition starts equal
+                self.max_priority = 1.0
+                if self.size > 0:
+                    self.priorities.update(np.arange(self.size), self.max_priority)
+                return
+
+            if self.size > 0:
+                self.priorities.update(np.arange(self.size), data["priorities"])
+            self.max_priority = float(data["max_priority"])
+            self.beta = float(data["beta"])
+
+class SharedReplayStore(GraphStore):
+    def __init__(self, capacity=30000, recent=1024):
+        """
+        The boards of every player's decisions, stored once for the
+        PerspectiveMemory of each player. A board is the state of one
+        transition and the next state of the one before it, both refer to
+        the same copy here.
+
+        Boards are numbered in the order they are added, board n lives in
+        slot n % capacity until capacity newer boards overwrite it.
+        Transitions arrive as separate tuples, so a board is recognized by
+        the identity of its node features array, for the last recent boards.
+        """
+        super().__init__()
+        self.capacity = capacity
+        self.count = 0 # boards added so far
+        self.allocated = False
+
+        self.max_recent = recent
+        self.recent = OrderedDict() # id(node features) -> (node features, board)
+
+    def allocate(self, node_features):
+        self.node_features = np.zeros((self.capacity, *np.shape(node_features)), dtype=np.float32)
+        self.graph = np.zeros(self.capacity, dtype=np.int32)
+        self.allocated = True
+
+    @property
+    def oldest(self):
+        """The number of the oldest board still stored"""
+        return max(0, self.count - self.capacity)
+
+    def add(self, node_features, adjacency):
+        """Returns the number of the board, storing it unless it is already"""
+        key = id(node_features)
+        if key in self.recent:
+            original, board = self.recent.pop(key)
+            if original is node_features and board >= self.oldest:
+                self.recent[key] = (original, board)
+                return board
+
+        if not self.allocated:
+            self.allocate(node_features)
+
+        board = self.count
+        i = board % self.capacity
+        self.node_features[i] = node_features
+        self.graph[i] = self.get_graph_id(adjacency)
+        self.count += 1
+
+        self.recent[key] = (node_features, board)
+        if len(self.recent) > self.max_recent:
+            self.recent.popitem(last=False)
+        return board
+
+    def get(self, boards):
+        """The node features and graph ids of the numbered boards"""
+        slots = boards % self.capacity
+        return self.node_features[slots], self.graph[slots]
+
+    def snapshot(self):
+        """Copies of the filled part of the arrays and the board count"""
+        filled = min(self.count, self.capacity)
+        arrays = {"count": self.count, "graphs": self.graphs.copy()}
+        if self.allocated:
+            arrays.update({"node_features": self.node_features[:filled].copy(), "graph": self.graph[:filled].copy()})
+        return arrays
+
+    def save(self, path):
+        np.savez_compressed(path, **self.snapshot())
+
+    def load(self, path):
+        """Replaces the contents with a store written by save"""
+        with np.load(path) as data:
+            self.load_graphs(data["graphs"])
+            self.count = int(data["count"])
+            self.recent.clear()
+
+            filled = min(self.count, self.capacity)
+            if "node_features" in data and len(data["node_features"]) != filled:
+                raise ValueError(f"Saved store holds {len(data['node_features'])} boards, the capacity is {self.capacity}")
+
+            self.allocated = False
+            if filled > 0:
+                self.allocate(data["node_features"][0])
+                self.node_features[:filled] = data["node_features"]
+                self.graph[:filled] = data["graph"]
+
+class PerspectiveMemory(ReplayMemory):
+    def __init__(self, store, capacity=10000):
+        """
+        One player's view of a SharedReplayStore. Its transitions keep the
+        numbers of their boards in the store next to their own player
+        features, action, reward and done, samples come out exactly like
+        ReplayMemory's.
+
+        The store overwrites its oldest boards as all the players add new
+        ones, the transitions on them are dropped from the oldest end.
+        """
+        super().__init__(capacity)
+        self.store = store
+
+    def allocate(self, state):
+        _, _, player_features = state
+        self.board = np.zeros(self.capacity, dtype=np.int64)
+        self.next_board = np.zeros(self.capacity, dtype=np.int64)
+        self.player_features = np.zeros((self.capacity, len(player_features)), dtype=np.float32)
+        self.next_player_features = np.zeros_like(self.player_features)
+
+        self.actions = np.zeros(self.capacity, dtype=np.int64)
+        self.rewards = np.zeros(self.capacity, dtype=np.float32)
+        self.dones = np.zeros(self.capacity, dtype=np.float32)
+        self.allocated = True
+
+    def add(self, state, action, reward, next_state, done):
+        if not self.allocated:
+            self.allocate(state)
+
+        i = self.position
+        self.board[i] = self.store.add(state[0], state[1])
+        self.next_board[i] = self.store.add(next_state[0], next_state[1])
+        self.player_features[i] = state[2]
+        self.next_player_features[i] = next_state[2]
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.dones[i] = done
+
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def slots(self):
+        """Where the stored transitions are, oldest first"""
+        return (self.position - self.size + np.arange(self.size)) % self.capacity
+
+    def expire(self):
+        """Drops the transitions up to the newest one whose board was overwritten"""
+        if self.size > 0:
+            stale = np.flatnonzero(self.board[self.slots()] < self.store.oldest)
+            if len(stale) > 0:
+                self.size -= stale[-1] + 1
+
+    def sample(self, batch_size):
+        """Draws batch_size distinct transitions uniformly, see ReplayMemory.sample"""
+        self.expire()
+        indices = self.slots()[random.sample(range(self.size), batch_size)]
+        return (*self.gather(indices), indices, np.ones(batch_size, dtype=np.float32))
+
+    def gather(self, indices):
+        node_features, graph = self.store.get(self.board[indices])
+        next_node_features, _ = self.store.get(self.next_board[indices])
+        return (
+            [node_features, graph, self.player_features[indices]],
+            self.actions[indices],
+            self.rewards[indices],
+            [next_node_features, graph, self.next_player_features[indices]],
+            self.dones[indices],
+        )
+
+    # the graph ids are the store's
+    def adjacency_batch(self, graph_ids):
+        return self.store.adjacency_batch(graph_ids)
+
+    def edge_batch(self, graph_ids):
+        return self.store.edge_batch(graph_ids)
+
+    FIELDS = ["board", "player_features", "next_board", "next_player_features", "actions", "rewards", "dones"]
+
+    def snapshot(self):
+        """
+        Like ReplayMemory.snapshot, with the transitions moved to the front
+        oldest first, which samples the same. The boards are in the store's
+        own snapshot.
+        """
+        self.expire()
+        slots = self.slots()
+        arrays = {"position": self.size % self.capacity, "graphs": self.graphs.copy()}
+        if self.allocated:
+            arrays.update({field: getattr(self, field)[slots] for field in self.FIELDS})
+        return arrays
+
+    def saved_state(self, data):
+        return None, None, data["player_features"][0]
+
+    def __len__(self):
+        self.expire()
+        return self.size
@@ -1,70 +1,94 @@
 import json
-import pygame, sys
+import sys
+import random
+import numpy as np
 from random import randint
-from copy import deepcopy
+from copy import copy, deepcopy
 from typing import List
 
 from map import Map
-from log import EventLog
+from log import EventLog, Record
 from event import Event, TacticalAction
 from player import Player
-from player_tracker import PlayerTracker
 from units import Carrier, Cruiser, Destroyer, Dreadnought, WarSun, Fighter, SpaceDock, GroundForce
-from ti4_model import TwilightImperiumRL
 
 from attack import attack
+from state import take_snapshot, restore_snapshot, encode_state, decode_state
 
 from utils import load_json
+from registry import get_disposition
+from log_writer import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAP_STRING = "42 30 41 38 29 34 23 28 27 46 20 21 37 50 32 22 31 25 0 0 39 2 24 0 0 0 36 4 33 0 0 0 40 1 26 0"
+
+def default_starting_units():
+    return [
+        Carrier(),
+        Carrier(),
+        GroundForce(),
+        GroundForce(),
+        GroundForce(),
+        GroundForce(),
+        Destroyer(),
+        SpaceDock()
+        ]
 
 class Simulation:
-    def __init__(self, screen, clock):
+    def __init__(self, screen=None, clock=None, models=None, map_string=DEFAULT_MAP_STRING, num_players=None):
+        """
+        Runs a game. Without a screen the simulation is headless and never
+        imports pygame, with one the board, event log and player tracker are
+        drawn on it.
+
+        Args:
+            models (list): Model for each player to share, each player builds
+                its own when not given
+            map_string (str): The galaxy to play on, see map.generate_map_string
+            num_players (int): Defaults to one player per model, or per home
+                system on the map without models
+        """
         #self.config = load_json("")
         # Muatt, Jord, Mol Primus
-        self.event_log = EventLog()
-
-        self.initialize_game()
-
-        self.player_tracker = PlayerTracker(self.players)
-
         self.clock = clock
         self.screen = screen
+        self.visible = screen is not None
+
+        self.event_log = EventLog()
+        self.map_view = None
+        self.event_log_view = None
+        self.player_tracker = None
+
+        self.initialize_game(models, map_string, num_players)
 
         self.running = True
         self.game_over = False
-        self.visible = True
 
         #===== Game Attributes =====#
         self.game_phase = "strategy"
 
-    def initialize_game(self):
-        self.game_map = Map(map_string="42 30 41 38 29 34 23 28 27 46 20 21 37 50 32 22 31 25 0 0 39 2 24 0 0 0 36 4 33 0 0 0 40 1 26 0")
+    def initialize_game(self, models=None, map_string=DEFAULT_MAP_STRING, num_players=None):
+        self.game_map = Map(map_string=map_string)
 
-        for system in (starting_systems := self.game_map.get_start_tiles()):
+        starting_systems = self.game_map.get_start_tiles()
+        if num_players is None:
+            num_players = len(models) if models is not None else len(starting_systems)
+        if num_players > len(starting_systems):
+            raise ValueError(f"The map has {len(starting_systems)} home systems, {num_players} players do not fit")
+
+        for system in starting_systems[:num_players]:
             for planet in system.planets:
                 planet.ready()
 
         self.players: list[Player] = []
-        for i, player in enumerate(["Player 1", "Player 2", "Player 3"]):
+        for i in range(num_players):
             self.players.append(
-                Player(player, 
+                Player(f"Player {i + 1}", 
                    _id=i,
                    starting_system=starting_systems[i],
-                   starting_units=[
-                       Carrier(), 
-                       Carrier(),
-                       GroundForce(),
-                       GroundForce(),
-                       GroundForce(),
-                       GroundForce(),
-                       Destroyer(),
-                       SpaceDock()
-                       ]))
-         
-        self.event_log.clear()
-
-        self.player_tracker = PlayerTracker(self.players)
-        self.first_player = randint(0, len(self.players)-1)
-        self.player_turn = self.first_player
+                   starting_units=default_starting_units(),
+                   shared_model=models[i] if models is not None else None))
 
         self.strategy_cards = [
             "leadership",
@@ -73,13 +97,135 @@ class Simulation:
             "warfare"
         ]
 
+        if self.visible:
+            self.initialize_views()
+
+        self.start_game()
+
+    def start_game(self):
+        self.event_log.clear()
+
+        self.first_player = randint(0, len(self.players)-1)
+        self.player_turn = self.first_player
+
         self.running = True
+        self.game_over = False
+        self.game_round = 1
         self.phase = "strategy"
 
-        self.event_log.add_event("[SYSTEM] Beginning the game!")
+        self.event_log.add_event(Record("system", outcome="Beginning the game!"))
 
         #features, adjacency = self.game_map.encode_board_state()
 
+    def reset(self, seed=None, map_string=None, players=None, starting_systems=None):
+        """
+        Restarts the game in place, reusing the map, tiles, planets and
+        players instead of rebuilding them (and re-reading their data files).
+
+        Args:
+            seed (int): Reseeds the Python and NumPy RNGs when given
+            map_string (str): Builds a new map if it differs from the current one
+            players (list): Players to seat instead of the current ones, their
+                models and dispositions are kept
+            starting_systems (list): Home system for each player, defaults to
+                the map's start tiles in order
+        """
+        if seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
+
+        if map_string is not None and list(map(int, map_string.split(" "))) != self.game_map.map_string:
+            self.game_map = Map(map_string=map_string)
+            if self.map_view is not None:
+                self.map_view.set_map(self.game_map)
+        else:
+            self.game_map.reset()
+
+        if players is not None:
+            self.players = list(players)
+
+        if starting_systems is None:
+            starting_systems = self.game_map.get_start_tiles()
+        # like initialize_game, home systems nobody is seated at stay exhausted
+        starting_systems = starting_systems[:len(self.players)]
+
+        for system in starting_systems:
+            for planet in system.planets:
+                planet.ready()
+
+        for player, system in zip(self.players, starting_systems):
+            player.reset(system, default_starting_units())
+
+        if self.visible:
+            from player_tracker import PlayerTracker
+            self.player_tracker = PlayerTracker(self.players)
+
+        self.start_game()
+
+    def initialize_views(self):
+        """Build the pygame views, only called when there is a screen to draw on"""
+        from map_view import MapView
+        from log_view import EventLogView
+        from player_tracker import PlayerTracker
+
+        self.map_view = MapView(self.game_map)
+        self.event_log_view = EventLogView(self.event_log)
+        self.player_tracker = PlayerTracker(self.players)
+
+    def snapshot(self):
+        """
+        Captures the mutable game state (players, tiles, planets, units,
+        command counters, phase and RNG state) as a GameSnapshot.
+        """
+        return take_snapshot(self)
+
+    def restore(self, snapshot, restore_rng=True):
+        """
+        Rolls the game back to a snapshot taken with Simulation.snapshot
+        """
+        restore_snapshot(self, snapshot, restore_rng=restore_rng)
+
+    def to_bytes(self):
+        """
+        Encodes the full game state as compact binary, see state.encode_state
+        """
+        return encode_state(self)
+
+    def load_bytes(self, data, restore_rng=True):
+        """
+        Restores a game state encoded with Simulation.to_bytes. The
+        simulation must be built from the same map and seat as many players.
+        """
+        map_string, players, snapshot = decode_state(data)
+        if map_string != self.game_map.map_string:
+            raise ValueError("Encoded state was recorded on a different map")
+
+        for player, (name, disposition) in zip(self.players, players):
+            player.name = name
+            if disposition != player.disposition_name:
+                player.disposition_name = disposition
+                player.disposition = get_disposition(disposition)
+
+        self.restore(snapshot, restore_rng=restore_rng)
+
+    def fork(self):
+        """
+        Returns an independent, headless copy of the game for what-if
+        evaluation. Static data (tile images, planet data, models,
+        dispositions) is shared with this simulation, only the mutable state
+        is copied. The global RNG is left untouched.
+        """
+        clone = copy(self)
+        clone.game_map = self.game_map.fork()
+        clone.players = [player.fork() for player in self.players]
+        clone.event_log = EventLog()
+        clone.map_view = None
+        clone.event_log_view = None
+        clone.player_tracker = None
+        clone.visible = False
+        clone.restore(self.snapshot(), restore_rng=False)
+        return clone
+
     def strategy_phase(self):
         '''available_cards = deepcopy(self.strategy_cards)
         for i in range(len(self.players)):
@@ -94,7 +240,7 @@ class Simulation:
 
         
         self.phase = "action"
-        self.event_log.add_event(f"[SYSTEM] Beginning the action phase!")
+        self.event_log.add_event(Record("system", outcome="Beginning the action phase!"))
 
 
     def status_phase(self):
@@ -105,11 +251,22 @@ class Simulation:
         self.phase = "strategy"
         
     def take_turn(self):
+        if (current_player := self.next_player()) is None:
+            return
+
+        action = current_player.take_action(self.game_map)
+        self.execute_action(action)
+
+    def next_player(self):
+        """
+        Hands the turn to the next player, or moves on to the status phase
+        and returns None once everyone has passed
+        """
         if sum([p.passed for p in self.players]) == len(self.players):
             self.first_player += 1
             self.first_player %= len(self.players)
             self.phase = "status"
-            return
+            return None
         
         else:
             self.player_turn = (self.player_turn + 1) % len(self.players)
@@ -117,16 +274,20 @@ class Simulation:
         
         current_player = self.players[self.player_turn]
 
-        print(f"======================== ACTION [{current_player.name}]==========================")
+        logger.debug("======================== ACTION [%s]==========================", current_player.name)
 
-        action = current_player.take_action(self.game_map)
+        return current_player
+
+    def execute_action(self, action):
         res = action.execute() # updates the board
-        for r in res:
-            print(r)
-        self.event_log.add_event(str(res))
+        for record in res:
+            logger.debug("%s", record)
+            self.event_log.add_event(record)
 
         
     def handle_user_input(self):
+        import pygame
+
         mouse_pos = pygame.mouse.get_pos()
 
         # Handle events
@@ -138,19 +299,21 @@ class Simulation:
             
             # Panning controls
             if event.type == pygame.MOUSEBUTTONDOWN:
-                self.game_map.start_pan(mouse_pos, event)
+                self.map_view.start_pan(mouse_pos, event)
                 self.player_tracker.handle_mouse_click(mouse_pos)
             
             if event.type == pygame.MOUSEBUTTONUP:
-                self.game_map.end_pan(event)
+                self.map_view.end_pan(event)
             
             # Zooming controls
             if event.type == pygame.MOUSEWHEEL:
-                self.game_map.zoom(mouse_pos, event)
-                self.event_log.handle_mouse_wheel(mouse_pos, event)
+                self.map_view.zoom(mouse_pos, event)
+                self.event_log_view.handle_mouse_wheel(mouse_pos, event)
                 self.player_tracker.handle_mouse_wheel(mouse_pos, event)
 
     def update(self):
+        import pygame
+
         # get mouse pos
         mouse_pos = pygame.mouse.get_pos()
 
@@ -160,18 +323,18 @@ class Simulation:
         self.screen.fill((0, 0, 0))  # Black background
         
         # Update map with panning, zooming, and mouse position
-        self.game_map.update(mouse_pos)
+        self.map_view.update(mouse_pos)
         
         # Draw the map
-        self.game_map.draw(self.screen)
+        self.map_view.draw(self.screen)
 
-        self.event_log.update()
-        self.event_log.draw(self.screen)
+        self.event_log_view.update()
+        self.event_log_view.draw(self.screen)
 
         self.player_tracker.update()
         self.player_tracker.draw(self.screen)
 
-        self.game_map.draw_hover(self.screen, mouse_pos)
+        self.map_view.draw_hover(self.screen, mouse_pos)
 
          # Update the display
         pygame.display.flip()
@@ -186,10 +349,9 @@ class Simulation:
 
             if not self.game_over:
                 if self.phase == "strategy":
-                    print(f"[SYSTEM] ============ Round {self.game_round} ================")
+                    logger.info("[SYSTEM] ============ Round %d ================", self.game_round)
                     for player in self.players:
-                        print(f"{player.name} has {player.points} points")
-                    print("\n\n")
+                        logger.info("%s has %d points", player.name, player.points)
 
                     self.strategy_phase()
                 elif self.phase == "action":
@@ -201,13 +363,12 @@ class Simulation:
                 victors = [p for p in self.players if p.points >= 50]
                 if victors != []:
                     victor = max(victors, key=lambda x: x.points)
-                    print(f"{victor.name} won the game!")
+                    logger.info("%s won the game!", victor.name)
                     self.game_over = True
 
-                    print(f"[SYSTEM] ============ GAME OVER (Round {self.game_round}) ================")
+                    logger.info("[SYSTEM] ============ GAME OVER (Round %d) ================", self.game_round)
                     for player in self.players:
-                        print(f"{player.name} has {player.points} points")
-                    print("\n\n")
+                        logger.info("%s has %d points", player.name, player.points)
             
             self.update()
 
@@ -0,0 +1,403 @@
+import random
+import struct
+import numpy as np
+
+from units import Carrier, Cruiser, Destroyer, Dreadnought, WarSun, Fighter, GroundForce
+
+# maps the unit name stored in a snapshot back to the class that builds it
+UNIT_TYPES = {
+    "carrier": Carrier,
+    "cruiser": Cruiser,
+    "destroyer": Destroyer,
+    "dreadnought": Dreadnought,
+    "warsun": WarSun,
+    "fighter": Fighter,
+    "infantry": GroundForce,
+}
+
+# binary state format, bump STATE_VERSION whenever the layout changes
+STATE_MAGIC = b"TI4S"
+STATE_VERSION = 1
+UNIT_CODES = {name: i for i, name in enumerate(UNIT_TYPES)}
+UNIT_NAMES = list(UNIT_TYPES)
+
+class GameSnapshot():
+    """
+    A compact, immutable capture of the mutable state of a Simulation.
+
+    Everything is stored as tuples of plain values. Objects that reference
+    each other (ships in a tile, planets owned by a player, ...) are stored
+    as indices into the tile, planet, ship and player orderings of the map,
+    so a snapshot can be restored onto any simulation built from the same
+    map string.
+    """
+    __slots__ = ("phase", "game_round", "first_player", "player_turn", "game_over",
+                 "players", "tiles", "planets", "ships", "rng")
+
+    def __init__(self, phase, game_round, first_player, player_turn, game_over,
+                 players, tiles, planets, ships, rng):
+        self.phase = phase
+        self.game_round = game_round
+        self.first_player = first_player
+        self.player_turn = player_turn
+        self.game_over = game_over
+
+        self.players = players # (points, score, tactic, fleet, passed, strategy card, planets, ships)
+        self.tiles = tiles     # (is active, command counters, ships in the space area)
+        self.planets = planets # (owner, ready, space dock, pds, ground force count, ground force owners)
+        self.ships = ships     # (name, owner, health, system, cargo)
+        self.rng = rng         # (random state, numpy random state)
+
+def owner_index(unit, player_index):
+    return player_index.get(id(unit.owner), -1)
+
+def current_ships(sim, tiles):
+    """
+    Returns every ship in the game once, in the order used by snapshots
+    """
+    ships = {}
+    for ship in [ship for player in sim.players for ship in player.ships] + \
+                [ship for tile in tiles for ship in tile.space_area]:
+        ships.setdefault(id(ship), ship)
+    return list(ships.values())
+
+def take_snapshot(sim):
+    """
+    Captures the players, tiles, planets, units, command counters, phase
+    and RNG state of a simulation.
+    """
+    tiles = list(sim.game_map.tiles.values())
+    planets = [planet for tile in tiles for planet in tile.planets]
+
+    tile_index = {id(tile): i for i, tile in enumerate(tiles)}
+    planet_index = {id(planet): i for i, planet in enumerate(planets)}
+    player_index = {id(player): i for i, player in enumerate(sim.players)}
+
+    # ships can be referenced by a player and a tile, so they are numbered once
+    ships = current_ships(sim, tiles)
+    ship_index = {id(ship): i for i, ship in enumerate(ships)}
+
+    encoded_ships = tuple(
+        (ship.name,
+         owner_index(ship, player_index),
+         ship.health,
+         tile_index.get(id(ship.system), -1),
+         tuple((unit.name, owner_index(unit, player_index)) for unit in ship.in_cargo))
+        for ship in ships
+    )
+
+    encoded_tiles = tuple(
+        (tile.is_active,
+         tuple(tile.command_counters),
+         tuple(ship_index[id(ship)] for ship in tile.space_area))
+        for tile in tiles
+    )
+
+    encoded_planets = tuple(
+        (player_index.get(id(planet.owner), -1),
+         planet.is_ready,
+         planet.has_space_dock,
+         planet.num_pds,
+         planet.num_ground_forces,
+         tuple(owner_index(unit, player_index) for unit in planet.ground_forces))
+        for planet in planets
+    )
+
+    encoded_players = tuple(
+        (player.points,
+         player.score,
+         player.command_counters["tactic"],
+         player.command_counters["fleet"],
+         player.passed,
+         player.strategy_card,
+         tuple(planet_index[id(planet)] for planet in player.planets),
+         tuple(ship_index[id(ship)] for ship in player.ships))
+        for player in sim.players
+    )
+
+    return GameSnapshot(
+        phase=sim.phase,
+        game_round=getattr(sim, "game_round", 1),
+        first_player=sim.first_player,
+        player_turn=sim.player_turn,
+        game_over=sim.game_over,
+        players=encoded_players,
+        tiles=encoded_tiles,
+        planets=encoded_planets,
+        ships=encoded_ships,
+        rng=(random.getstate(), np.random.get_state()),
+    )
+
+def restore_snapshot(sim, snapshot, restore_rng=True):
+    """
+    Restores a snapshot onto a simulation in place. The simulation must have
+    been built from the same map and seat the same number of players.
+    """
+    tiles = list(sim.game_map.tiles.values())
+    planets = [planet for tile in tiles for planet in tile.planets]
+
+    if len(tiles) != len(snapshot.tiles) or len(planets) != len(snapshot.planets):
+        raise ValueError("Snapshot was taken on a different map")
+    if len(sim.players) != len(snapshot.players):
+        raise ValueError(f"Snapshot has {len(snapshot.players)} players, simulation has {len(sim.players)}")
+
+    def owner(i):
+        return sim.players[i] if i >= 0 else None
+
+    def build_unit(name, owner_id):
+        unit = UNIT_TYPES[name]()
+        if owner_id >= 0:
+            unit.set_ownership(sim.players[owner_id])
+        return unit
+
+    # reuse the ship objects currently in the game where possible. Planners
+    # iterate over sets of ships, whose order depends on object identity, so
+    # handing out the same objects keeps repeated restores deterministic
+    pool = {}
+    for ship in current_ships(sim, tiles):
+        pool.setdefault(ship.name, []).append(ship)
+    for unused in pool.values():
+        unused.reverse()
+
+    ships = []
+    for name, owner_id, health, system_id, cargo in snapshot.ships:
+        ship = pool[name].pop() if pool.get(name) else UNIT_TYPES[name]()
+        ship.owner = owner(owner_id)
+        ship.health = health
+        ship.system = tiles[system_id] if system_id >= 0 else None
+        ship.in_cargo = [build_unit(*unit) for unit in cargo]
+        for unit in ship.in_cargo:
+            if isinstance(unit, GroundForce):
+                unit.planet = None
+        ships.append(ship)
+
+    for tile, (is_active, command_counters, space_area) in zip(tiles, snapshot.tiles):
+        tile.is_active = is_active
+        tile.command_counters = list(command_counters)
+        tile.space_area = [ships[i] for i in space_area]
+
+    for planet, (owner_id, is_ready, has_space_dock, num_pds, num_ground_forces, ground_forces) \
+            in zip(planets, snapshot.planets):
+        planet.owner = owner(owner_id)
+        planet.is_ready = is_ready
+        planet.has_space_dock = has_space_dock
+        planet.num_pds = num_pds
+        planet.num_ground_forces = num_ground_forces
+        planet.ground_forces = []
+        for owner_id in ground_forces:
+            unit = build_unit("infantry", owner_id)
+            unit.planet = planet
+            planet.ground_forces.append(unit)
+
+    for tile in tiles:
+        tile.touch()
+
+    for player, (points, score, tactic, fleet, passed, strategy_card, owned_planets, owned_ships) \
+            in zip(sim.players, snapshot.players):
+        player.points = points
+        player.score = score
+        player.command_counters = {"tactic": tactic, "fleet": fleet}
+        player.passed = passed
+        player.strategy_card = strategy_card
+        player.planets = [planets[i] for i in owned_planets]
+        player.ships = [ships[i] for i in owned_ships]
+
+    sim.phase = snapshot.phase
+    sim.game_round = snapshot.game_round
+    sim.first_player = snapshot.first_player
+    sim.player_turn = snapshot.player_turn
+    sim.game_over = snapshot.game_over
+
+    if restore_rng:
+        python_state, numpy_state = snapshot.rng
+        random.setstate(python_state)
+        np.random.set_state(numpy_state)
+
+
+class StateWriter():
+    """
+    Little-endian binary writer used by encode_state
+    """
+    def __init__(self):
+        self.buf = bytearray()
+
+    def pack(self, fmt, *values):
+        self.buf += struct.pack("<" + fmt, *values)
+
+    def pack_str(self, text):
+        # a length of 255 marks None
+        if text is None:
+            self.pack("B", 255)
+            return
+        raw = text.encode("utf-8")
+        if len(raw) >= 255:
+            raise ValueError(f"String too long to encode: {text!r}")
+        self.pack("B", len(raw))
+        self.buf += raw
+
+    def pack_list(self, fmt, values):
+        self.pack("H", len(values))
+        self.buf += struct.pack(f"<{len(values)}{fmt}", *values)
+
+class StateReader():
+    """
+    Reads back the layout written by StateWriter
+    """
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def unpack(self, fmt):
+        fmt = "<" + fmt
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def unpack_one(self, fmt):
+        return self.unpack(fmt)[0]
+
+    def unpack_str(self):
+        length = self.unpack_one("B")
+        if length == 255:
+            return None
+        text = bytes(self.data[self.offset:self.offset + length]).decode("utf-8")
+        self.offset += length
+        return text
+
+    def unpack_list(self, fmt):
+        length = self.unpack_one("H")
+        return self.unpack(f"{length}{fmt}")
+
+def encode_state(sim, snapshot=None):
+    """
+    Encodes the full game state (map string, players and their dispositions,
+    tile activations, planets, units and RNG) as compact versioned bytes.
+
+    Returns:
+        bytes: can be written to disk or sent between processes, and read
+        back with decode_state
+    """
+    if snapshot is None:
+        snapshot = take_snapshot(sim)
+
+    names = [player.name for player in sim.players]
+    writer = StateWriter()
+    writer.buf += STATE_MAGIC
+    writer.pack("B", STATE_VERSION)
+
+    #===== Static Setup =====#
+    writer.pack_list("H", sim.game_map.map_string)
+    writer.pack("B", len(sim.players))
+    for player in sim.players:
+        writer.pack_str(player.name)
+        writer.pack_str(player.disposition_name)
+
+    #===== Game Flow =====#
+    writer.pack_str(snapshot.phase)
+    writer.pack("Hbb?", snapshot.game_round, snapshot.first_player, snapshot.player_turn, snapshot.game_over)
+
+    #===== Board =====#
+    writer.pack("H", len(snapshot.ships))
+    for name, owner_id, health, system_id, cargo in snapshot.ships:
+        writer.pack("Bbbh", UNIT_CODES[name], owner_id, health, system_id)
+        writer.pack_list("b", [value for unit_name, unit_owner in cargo
+                               for value in (UNIT_CODES[unit_name], unit_owner)])
+
+    writer.pack("H", len(snapshot.tiles))
+    for is_active, command_counters, space_area in snapshot.tiles:
+        writer.pack("?", is_active)
+        writer.pack_list("b", [names.index(name) for name in command_counters])
+        writer.pack_list("H", space_area)
+
+    writer.pack("H", len(snapshot.planets))
+    for owner_id, is_ready, has_space_dock, num_pds, num_ground_forces, ground_forces in snapshot.planets:
+        writer.pack("b??Bh", owner_id, is_ready, has_space_dock, num_pds, num_ground_forces)
+        writer.pack_list("b", ground_forces)
+
+    for points, score, tactic, fleet, passed, strategy_card, planets, ships in snapshot.players:
+        writer.pack("iihh?", points, score, tactic, fleet, passed)
+        writer.pack_str(strategy_card)
+        writer.pack_list("H", planets)
+        writer.pack_list("H", ships)
+
+    #===== RNG =====#
+    (version, internal, gauss_next), numpy_state = snapshot.rng
+    writer.pack("B", version)
+    writer.pack_list("I", internal)
+    writer.pack("?d", gauss_next is not None, gauss_next or 0.0)
+
+    _, keys, pos, has_gauss, cached_gaussian = numpy_state
+    writer.pack_list("I", keys.tolist())
+    writer.pack("iid", pos, has_gauss, cached_gaussian)
+
+    return bytes(writer.buf)
+
+def decode_state(data):
+    """
+    Decodes bytes written by encode_state.
+
+    Returns:
+        map_string (list): tile ids the map was generated from
+        players (list): (name, disposition) for each seat
+        snapshot (GameSnapshot): the game state
+    """
+    if bytes(data[:len(STATE_MAGIC)]) != STATE_MAGIC:
+        raise ValueError("Not an encoded game state")
+    reader = StateReader(data)
+    reader.offset = len(STATE_MAGIC)
+    if (version := reader.unpack_one("B")) != STATE_VERSION:
+        raise ValueError(f"Unsupported game state version {version}, expected {STATE_VERSION}")
+
+    map_string = list(reader.unpack_list("H"))
+    players = [(reader.unpack_str(), reader.unpack_str()) for _ in range(reader.unpack_one("B"))]
+    names = [name for name, _ in players]
+
+    phase = reader.unpack_str()
+    game_round, first_player, player_turn, game_over = reader.unpack("Hbb?")
+
+    ships = []
+    for _ in range(reader.unpack_one("H")):
+        code, owner_id, health, system_id = reader.unpack("Bbbh")
+        cargo = reader.unpack_list("b")
+        cargo = tuple((UNIT_NAMES[cargo[i]], cargo[i + 1]) for i in range(0, len(cargo), 2))
+        ships.append((UNIT_NAMES[code], owner_id, health, system_id, cargo))
+
+    tiles = []
+    for _ in range(reader.unpack_one("H")):
+        is_active = reader.unpack_one("?")
+        command_counters = tuple(names[i] for i in reader.unpack_list("b"))
+        tiles.append((is_active, command_counters, reader.unpack_list("H")))
+
+    planets = []
+    for _ in range(reader.unpack_one("H")):
+        planets.append(reader.unpack("b??Bh") + (reader.unpack_list("b"),))
+
+    encoded_players = []
+    for _ in players:
+        points, score, tactic, fleet, passed = reader.unpack("iihh?")
+        strategy_card = reader.unpack_str()
+        encoded_players.append((points, score, tactic, fleet, passed, strategy_card,
+                                reader.unpack_list("H"), reader.unpack_list("H")))
+
+    version = reader.unpack_one("B")
+    internal = reader.unpack_list("I")
+    has_gauss_next, gauss_next = reader.unpack("?d")
+    python_state = (version, internal, gauss_next if has_gauss_next else None)
+
+    keys = np.array(reader.unpack_list("I"), dtype=np.uint32)
+    pos, has_gauss, cached_gaussian = reader.unpack("iid")
+    numpy_state = ("MT19937", keys, pos, has_gauss, cached_gaussian)
+
+    snapshot = GameSnapshot(
+        phase=phase,
+        game_round=game_round,
+        first_player=first_player,
+        player_turn=player_turn,
+        game_over=game_over,
+        players=tuple(encoded_players),
+        tiles=tuple(tiles),
+        planets=tuple(planets),
+        ships=tuple(ships),
+        rng=(python_state, numpy_state),
+    )
+    return map_string, players, snapshot
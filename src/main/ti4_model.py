@@ -1,15 +1,20 @@
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras.layers import Lambda
-from tensorflow.keras import layers, Model, Input
+from tensorflow.keras import layers, losses, Model, Input
 from tensorflow.keras.optimizers import Adam
+import os
+import json
 import random
-from collections import deque
+
+from board_encoder import get_edges, stack_edges
+from replay_memory import ReplayMemory, PrioritizedReplayMemory, PerspectiveMemory
 
 class TwilightImperiumRL:
     def __init__(self, input_feature_dim=19, hidden_dims=[64, 128, 64], 
                  gamma=0.99, epsilon=0.0, epsilon_decay=0.995, epsilon_min=0.01,
-                 learning_rate=0.001, memory_size=10000, batch_size=32):
+                 learning_rate=0.001, memory_size=10000, batch_size=32, prioritized_replay=False,
+                 replay_store=None, num_seats=0, sparse_adjacency=False):
         # RL parameters
         self.gamma = gamma  # Discount factor
         self.epsilon = epsilon  # Exploration rate
@@ -21,17 +26,33 @@ class TwilightImperiumRL:
         # Model parameters
         self.input_feature_dim = input_feature_dim
         self.hidden_dims = hidden_dims
+        # a model that plays num_seats seats also gets a one-hot of the seat, see Player.get_state
+        self.num_seats = num_seats
+        # the adjacency goes in as the edge lists of the boards instead of dense
+        # matrices, see GraphConvLayer. Slower on the galaxies the game is
+        # played on, the dense batches grow with tiles squared though
+        self.sparse_adjacency = sparse_adjacency
         
         # Action space size (number of possible actions)
         self.action_size = self._get_action_space_size()
         
-        # Replay memory
-        self.memory = deque(maxlen=memory_size)
+        # Replay memory, prioritized replays the transitions with the largest TD errors more often.
+        # Players given the same replay_store keep their boards in it once, see SharedReplayStore
+        if replay_store is not None:
+            if prioritized_replay:
+                raise ValueError("Prioritized replay does not support a shared replay store")
+            self.memory = PerspectiveMemory(replay_store, memory_size)
+        else:
+            self.memory = PrioritizedReplayMemory(memory_size) if prioritized_replay else ReplayMemory(memory_size)
         
         # Build model
         self.model = self._build_model()
         self.target_model = self._build_model()
         self.update_target_model()
+
+        # Traced once, every later call skips the Keras predict machinery
+        self.infer = self._build_inference(self.model)
+        self.train_step = self._build_train_step()
         
     def _get_action_space_size(self):
         # Define the number of possible actions in the game
@@ -42,9 +63,12 @@ class TwilightImperiumRL:
     def _build_model(self):
         # GCN inputs
         node_features_input = Input(shape=(None, self.input_feature_dim), name='node_features')
-        adjacency_input = Input(shape=(None, None), name='adjacency')
+        adjacency_input = Input(shape=(None, None), sparse=self.sparse_adjacency, name='adjacency')  # normalized, see BoardEncoder
         
-        # Process board state with GCN
+        # Process board state with GCN. Node features carry no position and
+        # the pooling below sums over the tiles, so relabeling the tiles
+        # (e.g. rotating or reflecting the galaxy together with its
+        # adjacency) gives the same outputs, no symmetry augmentation needed
         x = node_features_input
         for i, dim in enumerate(self.hidden_dims):
             x = GraphConvLayer(dim, name=f'gcn_{i}')([x, adjacency_input])
@@ -58,7 +82,7 @@ class TwilightImperiumRL:
         board_embedding = Lambda(lambda inputs: tf.reduce_sum(inputs[0] * inputs[1], axis=1))([x, attention_weights])
         
         # Player-specific features input
-        player_input = Input(shape=(20,), name='player_features')  # Adjust size as needed
+        player_input = Input(shape=(20 + self.num_seats,), name='player_features')  # Adjust size as needed
         
         # Combine board representation with player features
         combined = layers.Concatenate()([board_embedding, player_input])
@@ -92,143 +116,253 @@ class TwilightImperiumRL:
     
         return model
     
+    def _build_inference(self, model):
+        """
+        Compiled forward pass for acting. Takes batched float32 node features,
+        normalized adjacency and player features, any number of boards and tiles, and
+        returns the (policy, value) tensors. XLA compiles it once per batch
+        and board size, the sparse adjacency is not, it would recompile for
+        every number of edges.
+        """
+        @tf.function(jit_compile=not self.sparse_adjacency, input_signature=[
+            tf.TensorSpec(shape=(None, None, self.input_feature_dim), dtype=tf.float32),
+            self._adjacency_spec(),
+            tf.TensorSpec(shape=(None, model.input_shape[2][-1]), dtype=tf.float32),
+        ])
+        def infer(node_features, adjacency, player_features):
+            return model([node_features, adjacency, player_features], training=False)
+
+        return infer
+
+    def _build_train_step(self):
+        """
+        Compiled training step on one batch: the TD targets from the target
+        network and a single gradient step weighted by the sampling weights,
+        the update train_on_batch used to make without the Keras overhead.
+        Takes the float32 arrays the replay memory gathers with the
+        adjacency batched, see train_inputs, and returns the TD errors.
+        """
+        model, target_model = self.model, self.target_model
+        feature_dim = self.input_feature_dim
+        player_dim = model.input_shape[2][-1]
+
+        @tf.function(input_signature=[
+            tf.TensorSpec(shape=(None, None, feature_dim), dtype=tf.float32),
+            self._adjacency_spec(),
+            tf.TensorSpec(shape=(None, player_dim), dtype=tf.float32),
+            tf.TensorSpec(shape=(None,), dtype=tf.int64),
+            tf.TensorSpec(shape=(None,), dtype=tf.float32),
+            tf.TensorSpec(shape=(None, None, feature_dim), dtype=tf.float32),
+            tf.TensorSpec(shape=(None, player_dim), dtype=tf.float32),
+            tf.TensorSpec(shape=(None,), dtype=tf.float32),
+            tf.TensorSpec(shape=(None,), dtype=tf.float32),
+        ])
+        def train_step(node_features, adjacency, player_features, actions, rewards,
+                       next_node_features, next_player_features, dones, weights):
+            # a state and its next state are on the same board
+            states = [node_features, adjacency, player_features]
+
+            # Two forward passes for the whole batch: current policy and values, next state values
+            policy_pred, value_pred = model(states, training=False)
+            _, next_value = target_model([next_node_features, adjacency, next_player_features], training=False)
+
+            # Get target value, terminal transitions only keep their reward
+            targets_value = rewards + self.gamma * next_value[:, 0] * (1.0 - dones)
+
+            # Target policy is the prediction with the chosen action set to 1.0
+            chosen = tf.one_hot(actions, self.action_size) > 0
+            targets_policy = tf.where(chosen, 1.0, policy_pred)
+
+            with tf.GradientTape() as tape:
+                policy, value = model(states, training=True)
+                loss = (losses.categorical_crossentropy(targets_policy, policy)
+                        + losses.mse(targets_value[:, None], value))
+                # weighted to undo the bias of prioritized sampling
+                loss = tf.reduce_mean(loss * weights)
+            gradients = tape.gradient(loss, model.trainable_variables)
+            model.optimizer.apply_gradients(zip(gradients, model.trainable_variables))
+
+            return targets_value - value_pred[:, 0]
+
+        return train_step
+
+    def _adjacency_spec(self):
+        if self.sparse_adjacency:
+            return tf.SparseTensorSpec(shape=(None, None, None), dtype=tf.float32)
+        return tf.TensorSpec(shape=(None, None, None), dtype=tf.float32)
+
     def update_target_model(self):
         """Update the target model to match the primary model"""
         self.target_model.set_weights(self.model.get_weights())
     
+    def snapshot(self):
+        """
+        Copies everything training needs to continue: the variables of both
+        networks (including the dropout seed generators, which get_weights
+        leaves out), the optimizer state, epsilon and the replay memory.
+        Nothing in it changes when training goes on, so it can be written on
+        another thread, see write_snapshot.
+        """
+        return {
+            "variables": {
+                f"{name}/{i}": np.array(variable.numpy())
+                for name, variables in self.checkpoint_variables().items()
+                for i, variable in enumerate(variables)
+            },
+            "memory": self.memory.snapshot(),
+            "state": {"epsilon": self.epsilon},
+        }
+
+    def save(self, directory):
+        """Writes the model to directory, see snapshot"""
+        write_snapshot(directory, self.snapshot())
+
+    def load(self, directory):
+        """Restores a model written by save"""
+        with np.load(os.path.join(directory, "variables.npz")) as data:
+            for name, variables in self.checkpoint_variables().items():
+                saved = [key for key in data.files if key.startswith(f"{name}/")]
+                if len(saved) != len(variables):
+                    raise ValueError(f"Checkpoint has {len(saved)} {name} variables, the model has {len(variables)}")
+                for i, variable in enumerate(variables):
+                    variable.assign(data[f"{name}/{i}"])
+
+        self.memory.load(os.path.join(directory, "memory.npz"))
+        with open(os.path.join(directory, "state.json"), "r") as f:
+            self.epsilon = json.load(f)["epsilon"]
+
+    def checkpoint_variables(self):
+        # the optimizer only creates its slots on the first training step,
+        # building them early keeps checkpoints from before it loadable
+        if not self.model.optimizer.built:
+            self.model.optimizer.build(self.model.trainable_variables)
+
+        return {
+            "model": self.model.variables,
+            "target": self.target_model.variables,
+            "optimizer": self.model.optimizer.variables,
+        }
+
     def remember(self, state, action, reward, next_state, done):
         """Store experience in replay memory"""
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.add(state, action, reward, next_state, done)
     
     def choose_action(self, state, valid_actions=["reinforce", "produce", "attack"]):
         """
         Choose an action using epsilon-greedy policy
         
         Args:
-            state: Tuple of (node_features, adjacency_matrix, player_features)
+            state: Tuple of (node_features, normalized_adjacency, player_features)
             valid_actions: List of valid action indices
             
         Returns:
             action: Selected action index
         """
-        if np.random.rand() <= self.epsilon:
-            # Exploration: random action
-            return random.sample(valid_actions, len(valid_actions))
-        
+        return self.choose_actions([state], valid_actions)[0]
+
+    def choose_actions(self, states, valid_actions=["reinforce", "produce", "attack"]):
+        """
+        Batched choose_action: every state that is not explored goes through a
+        single forward pass instead of one predict call each
+
+        Args:
+            states: List of (node_features, normalized_adjacency, player_features)
+            valid_actions: List of valid action indices
+
+        Returns:
+            actions: Action priorities for each state, in order
+        """
+        actions = [None] * len(states)
+
+        # boards of different sizes cannot share a batch
+        batches = {}
+        for i, state in enumerate(states):
+            if np.random.rand() <= self.epsilon:
+                # Exploration: random action
+                actions[i] = random.sample(valid_actions, len(valid_actions))
+            else:
+                batches.setdefault(len(state[0]), []).append(i)
+
         # Exploitation: use model to predict best action
-        node_features, adjacency, player_features = state
-        
-        # Preprocess and reshape for model input
-        node_features = np.expand_dims(node_features, axis=0)
-        adjacency = np.expand_dims(adjacency, axis=0)
-        player_features = np.expand_dims(player_features, axis=0)
-        
-        # Get action probabilities
-        action_probs, _ = self.model.predict([node_features, adjacency, player_features],
-                                             verbose=0)
+        for indices in batches.values():
+            # Get action probabilities
+            action_probs, _ = self.infer(*self._stack([states[i] for i in indices]))
+            action_probs = action_probs.numpy()
 
-        # actions in the following order:
-        # "strategic", "reinforce", "produce", "attack"
+            # actions in the following order:
+            # "strategic", "reinforce", "produce", "attack"
+            for i, probs in zip(indices, action_probs):
+                # Filter to only valid actions
+                valid_probs = [(j, probs[j]) for j, _ in enumerate(valid_actions)]
+                valid_probs.sort(key=lambda x: x[1], reverse=True)
 
-        # Filter to only valid actions
-        valid_probs = [(i, action_probs[0][i]) for i, _ in enumerate(valid_actions)]
-        valid_probs.sort(key=lambda x: x[1], reverse=True)
+                # Return the action with highest probability
+                actions[i] = [valid_actions[valid_probs[j][0]] for j in range(len(valid_actions))]
 
-        
-        # Return the action with highest probability
-        return [valid_actions[valid_probs[i][0]] for i in range(len(valid_actions))]
+        return actions
     
-    def replay(self):
-        """Train the model on experiences from replay memory"""
+    def _stack(self, states):
+        """Stacks (node_features, adjacency, player_features) states into model inputs"""
+        node_features, adjacency, player_features = zip(*states)
+        node_features = np.array(node_features, dtype=np.float32)
+        player_features = np.array(player_features, dtype=np.float32)
+
+        if self.sparse_adjacency:
+            # the edge lists of the maps' adjacency were built with it, see BoardEncoder
+            adjacency = self._sparse_adjacency(*stack_edges([get_edges(a) for a in adjacency]), node_features.shape)
+        elif all(a is adjacency[0] for a in adjacency):
+            # the states of one map share its adjacency
+            adjacency = np.broadcast_to(adjacency[0], (len(states), *np.shape(adjacency[0])))
+        else:
+            adjacency = np.array(adjacency, dtype=np.float32)
+        return [node_features, adjacency, player_features]
+
+    def _sparse_adjacency(self, indices, values, node_features_shape):
+        """Batched edges as the sparse adjacency input, batch x tiles x tiles"""
+        batch_size, num_nodes = node_features_shape[:2]
+        return tf.SparseTensor(indices, values, (batch_size, num_nodes, num_nodes))
+
+    def replay(self, steps=1):
+        """Train the model on steps batches from replay memory"""
         if len(self.memory) < self.batch_size:
             return
-        
-        # Sample a batch of experiences
-        minibatch = random.sample(self.memory, self.batch_size)
-        
-        # Prepare batch data
-        node_features = []
-        adjacencies = []
-        player_features = []
-        targets_policy = []
-        targets_value = []
-        
-        for state, action, reward, next_state, done in minibatch:
-            # Unpack state components
-            nf, adj, pf = state
-            
-            # Preprocess for model input
-            nf = np.expand_dims(nf, axis=0)
-            adj = np.expand_dims(adj, axis=0)
-            pf = np.expand_dims(pf, axis=0)
-            
-            # Get current predictions
-            policy_pred, value_pred = self.model.predict([nf, adj, pf])
-            
-            # Get target value
-            if done:
-                target_value = reward
-            else:
-                next_nf, next_adj, next_pf = next_state
-                next_nf = np.expand_dims(next_nf, axis=0)
-                next_adj = np.expand_dims(next_adj, axis=0)
-                next_pf = np.expand_dims(next_pf, axis=0)
-                
-                _, next_value = self.target_model.predict([next_nf, next_adj, next_pf])
-                target_value = reward + self.gamma * next_value[0][0]
-            
-            # Create target policy (one-hot with actual action)
-            target_policy = policy_pred[0].copy()
-            target_policy[action] = 1.0  # Set chosen action to 1.0
-            
-            # Store batch data
-            node_features.append(nf[0])
-            adjacencies.append(adj[0])
-            player_features.append(pf[0])
-            targets_policy.append(target_policy)
-            targets_value.append([target_value])
-        
-        # Convert lists to arrays
-        node_features = np.array(node_features)
-        adjacencies = np.array(adjacencies)
-        player_features = np.array(player_features)
-        targets_policy = np.array(targets_policy)
-        targets_value = np.array(targets_value)
-        
-        # Train model
-        self.model.fit(
-            [node_features, adjacencies, player_features],
-            {'policy': targets_policy, 'value': targets_value},
-            epochs=1,
-            batch_size=self.batch_size,
-            verbose=0
-        )
-        
-        # Decay epsilon
-        if self.epsilon > self.epsilon_min:
-            self.epsilon *= self.epsilon_decay
-            
-    def preprocess_adjacency(self, adjacency_matrix):
-        """
-        Normalize the adjacency matrix for GCN processing
-        """
-        # Add self-loops: A_hat = A + I
-        adj_hat = adjacency_matrix + np.eye(adjacency_matrix.shape[0])
-        
-        # Compute degree matrix
-        degrees = np.sum(adj_hat, axis=1)
-        
-        # Compute D^(-1/2)
-        d_inv_sqrt = np.power(degrees, -0.5)
-        d_inv_sqrt[np.isinf(d_inv_sqrt)] = 0.0
-        d_mat_inv_sqrt = np.diag(d_inv_sqrt)
-        
-        # Compute normalized adjacency: D^(-1/2) * A_hat * D^(-1/2)
-        return d_mat_inv_sqrt @ adj_hat @ d_mat_inv_sqrt
 
+        for _ in range(steps):
+            # Sample a batch of experiences, already stacked into arrays
+            *batch, indices, weights = self.memory.sample(self.batch_size)
+            errors = self.train_step(*self.train_inputs(*batch, weights))
+            self.memory.update_priorities(indices, errors.numpy())
+
+            # Decay epsilon
+            if self.epsilon > self.epsilon_min:
+                self.epsilon *= self.epsilon_decay
+
+    def train_inputs(self, states, actions, rewards, next_states, dones, weights):
+        """A sampled batch as the arguments of train_step"""
+        node_features, graph, player_features = states
+        next_node_features, _, next_player_features = next_states
+        if self.sparse_adjacency:
+            adjacency = self._sparse_adjacency(*self.memory.edge_batch(graph), node_features.shape)
+        else:
+            adjacency = self.memory.adjacency_batch(graph)
+        return (node_features, adjacency, player_features, actions, rewards,
+                next_node_features, next_player_features, dones, weights)
+
+def write_snapshot(directory, snapshot):
+    """Writes a TwilightImperiumRL.snapshot in the layout load reads"""
+    os.makedirs(directory, exist_ok=True)
+    np.savez(os.path.join(directory, "variables.npz"), **snapshot["variables"])
+    np.savez_compressed(os.path.join(directory, "memory.npz"), **snapshot["memory"])
+    with open(os.path.join(directory, "state.json"), "w") as f:
+        json.dump(snapshot["state"], f)
 
 class GraphConvLayer(layers.Layer):
-    """Graph Convolutional Layer"""
+    """
+    Graph Convolutional Layer. The normalized adjacency comes in as a batch
+    of dense matrices, or as a batched tf.SparseTensor, then messages are
+    only passed along its non-zero entries so the cost grows with the
+    number of edges rather than tiles squared.
+    """
     def __init__(self, units, activation='relu', **kwargs):
         super(GraphConvLayer, self).__init__(**kwargs)
         self.units = units
@@ -249,8 +383,22 @@ class GraphConvLayer(layers.Layer):
     def call(self, inputs):
         node_features, normalized_adjacency = inputs
         support = tf.matmul(node_features, self.kernel)
-        output = tf.matmul(tf.cast(normalized_adjacency, tf.float32), support)
+
+        if isinstance(normalized_adjacency, tf.SparseTensor):
+            # the batch as one block diagonal matrix, row b*n+i holds A[b, i]
+            batch_size, num_nodes = tf.shape(support)[0], tf.shape(support)[1]
+            n = tf.cast(num_nodes, tf.int64)
+            edges = normalized_adjacency.indices
+            block_diagonal = tf.SparseTensor(
+                tf.stack([edges[:, 0] * n + edges[:, 1], edges[:, 0] * n + edges[:, 2]], axis=1),
+                normalized_adjacency.values,
+                tf.stack([tf.cast(batch_size, tf.int64) * n] * 2))
+            output = tf.sparse.sparse_dense_matmul(block_diagonal, tf.reshape(support, [-1, self.units]))
+            output = tf.reshape(output, [batch_size, num_nodes, self.units])
+        else:
+            output = tf.matmul(normalized_adjacency, support)
+
         output = output + self.bias
         if self.activation is not None:
             output = self.activation(output)
-        return output
\ No newline at end of file
+        return output
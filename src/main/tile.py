@@ -1,26 +1,24 @@
-import pygame
-import math
 import json
+from copy import copy
 
 from planet import Planet
 from player import Player
 
 class Tile():
-    def __init__(self, q, r, s, _id, scale=0.5, offset=(100,100), spacing=5, data=dict()):
+    def __init__(self, q, r, s, _id, data=dict()):
         """
-        Defines a hexagonal tile
+        Defines a hexagonal tile. Rendering lives in map_view.TileSprite, so
+        tiles can be built without pygame.
         """
         self.q = q
         self.r = r
         self.s = s
         self.coords = (q,r,s)
 
-        self.offset_x, self.offset_y = offset
-        self.scale = scale
-        self.spacing = spacing
-
         self._id = _id
-        self.get_img()
+
+        # bumped whenever the encoded state (ships, planets) changes, see board_encoder
+        self.version = 0
 
         self.planets = []
         self.initialize_planets(data)
@@ -35,16 +33,6 @@ class Tile():
 
         self.neighbors = set()
 
-    def get_img(self):
-        self.orig_img = pygame.image.load(f"src/data/tiles/ST_{self._id}.png").convert_alpha()
-
-        self.scale_img(self.scale)
-
-    def scale_img(self, factor):
-        self.img = pygame.transform.scale_by(self.orig_img, factor)
-        self.rect = self.img.get_rect()
-        self.width = self.rect.width//2 + self.spacing
-
     def initialize_planets(self, data):
         for planet_data in data["planets"]:
             self.planets.append(Planet(planet_data, self))
@@ -52,36 +40,6 @@ class Tile():
     def hexagonal_distance_to(self, other_tile):
         return max(abs(self.q - other_tile.q), abs(self.r - other_tile.r), abs(self.s - other_tile.s))
 
-    def get_pixel_position(self):
-        x = self.width * (3./2 * self.q) - self.width//2
-        y = self.width * (math.sqrt(3)/2 * self.q  +  math.sqrt(3) * self.r) - self.width//2
-        return (x, y)
-    
-    def get_zoomed_tile_position(self, pan_offset, center):
-        """
-        Calculate tile position considering zoom and pan
-        """
-        
-        # Adjust hex grid calculation for zooming
-        x = self.width * (3./2 * self.q)
-        y = self.width * (math.sqrt(3)/2 * self.q + math.sqrt(3) * self.r)
-        
-        # Center adjustment
-        zoomed_pos = (
-            x + center[0] - self.width//2, 
-            y + center[1] - self.width//2
-        )
-        
-        # Apply panning
-        pan_vec = pygame.Vector2(pan_offset)
-        final_pos = pygame.Vector2(zoomed_pos) + pan_vec
-        
-        self.draw_pos = final_pos
-
-    def draw(self, screen):
-        #pygame.draw.circle(screen, (255,0,0), self.get_pixel_position(), self.width / 2)
-        screen.blit(self.img, self.draw_pos)
-
     def activate(self, player: Player):
         self.is_active = True        
         self.command_counters.append(player.name)
@@ -97,12 +55,23 @@ class Tile():
         if player.name in self.command_counters:
             self.command_counters.remove(player.name)
 
+    def __hash__(self):
+        # tiles live in sets (neighbors, candidate systems), hashing by id
+        # would make their order and so every game differ between processes
+        return hash(self.coords)
+
+    def touch(self):
+        """Marks the tile's encoding as stale"""
+        self.version += 1
+
     def place_in_space_area(self, ship):
         self.space_area.append(ship)
+        self.touch()
 
     def remove_from_space_area(self, ship):
         if ship in self.space_area:
             self.space_area.remove(ship)
+            self.touch()
 
     def initialize_neighbors(self, game_map):
         # add neighbors to the tile
@@ -124,6 +93,25 @@ class Tile():
         if self in self.neighbors:
             self.neighbors.remove(self)
 
+    def reset(self):
+        self.clear()
+        self.space_area = []
+        for planet in self.planets:
+            planet.reset()
+        self.touch()
+
+    def fork(self):
+        """
+        Returns a copy of the tile that shares its static data.
+        Planets are copied, neighbors must be relinked by the owning map.
+        """
+        clone = copy(self)
+        clone.planets = [planet.fork(clone) for planet in self.planets]
+        clone.space_area = []
+        clone.command_counters = []
+        clone.neighbors = set()
+        return clone
+
     def get_neighbors(self, n=1):
         """
         Get neighbors of the tile
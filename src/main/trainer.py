@@ -1,23 +1,120 @@
-import os, sys
-from ti4_model import TwilightImperiumRL
+import os
+import shutil
+import pickle
+import numpy as np
+from copy import deepcopy
 from datetime import datetime
-import pygame
 from player import Player
-from simulation import Simulation
-from units import Carrier, Destroyer, GroundForce, SpaceDock
+from vector_simulation import VectorSimulation
+from simulation import DEFAULT_MAP_STRING
+from checkpoint_writer import CheckpointWriter, atomic_write
+from log_writer import LogWriter, get_logger
+from replay_memory import SharedReplayStore
 import random
 import json
 
 random.seed(42)
+np.random.seed(42)  # exploration draws from NumPy
+
+logger = get_logger(__name__)
+
+def create_models(num_players, epsilon=1.0, prioritized_replay=False, replay_store=None, shared_model=False,
+                  sparse_adjacency=False):
+    """
+    Builds one model per player, replay_store is shared by all of them if
+    given. With shared_model every seat gets the same model instead, which
+    also takes the seat as input and remembers and replays for all of them.
+    sparse_adjacency feeds the boards to the models as edge lists, see
+    TwilightImperiumRL.
+    """
+    # TensorFlow is only imported once the models are actually built
+    from ti4_model import TwilightImperiumRL
+    seats = num_players if shared_model else 1
+    models = [
+        TwilightImperiumRL(
+            input_feature_dim=19,  # Adjust as needed
+            hidden_dims=[64, 128, 64],
+            gamma=0.99,
+            epsilon=epsilon,  # Start with full exploration
+            epsilon_decay=0.995,
+            epsilon_min=0.1,
+            learning_rate=0.001,
+            memory_size=10000 * seats,
+            batch_size=32 * seats,  # one update for every seat
+            prioritized_replay=prioritized_replay,
+            replay_store=replay_store,
+            num_seats=seats if shared_model else 0,
+            sparse_adjacency=sparse_adjacency
+        )
+        for _ in range(num_players // seats)
+    ]
+    return models * seats
+
+def distinct_models(models):
+    """The models in seat order without repeats, a shared model appears once"""
+    return list(dict.fromkeys(models))
+
+def create_players(sim, models):
+    """Create the RL players for a game, one per model, cycling through the dispositions"""
+    dispositions = ["balanced", "defensive", "despot"]
+    start_tiles = sim.game_map.get_start_tiles()
+    return [
+        # Create RL player with corresponding model
+        Player(
+            f"RLPlayer_{i} ({dispositions[i % len(dispositions)]})",
+            _id=i,
+            starting_system=start_tiles[i],
+            starting_units=[],
+            shared_model=model,
+            disposition=dispositions[i % len(dispositions)]
+        )
+        for i, model in enumerate(models)
+    ]
+
+def random_starting_systems(env):
+    """Shuffles the home systems of every game in a VectorSimulation"""
+    return [
+        random.sample(start_tiles := sim.game_map.get_start_tiles(), len(start_tiles))
+        for sim in env.games
+    ]
+
+def summarize(sim, victory_points=50, max_rounds=10):
+    """The outcome of a finished game as plain data"""
+    return {
+        "round": sim.game_round,
+        "victory_points": victory_points,
+        "max_rounds": max_rounds,
+        "final_points": [(player.name, player.points) for player in sim.players],
+    }
+
+def prune_checkpoints(directory, keep):
+    """
+    Deletes all but the newest keep checkpoints in directory. They are
+    ordered by episode, the zero padding of the names stops at 9999.
+    """
+    checkpoints = sorted((int(name[len("checkpoint_"):]), name) for name in os.listdir(directory)
+                         if name.startswith("checkpoint_") and name[len("checkpoint_"):].isdigit())
+    for _, name in checkpoints[:-keep]:
+        shutil.rmtree(os.path.join(directory, name))
 
 class Trainer:
-    def __init__(self, num_players=3, episodes=1000, 
-                 headless=True, models_dir="models", logs_dir="logs"):
+    def __init__(self, num_players=3, episodes=1000, num_games=1, max_rounds=10,
+                 headless=True, models_dir="models", logs_dir="logs", map_string=DEFAULT_MAP_STRING,
+                 checkpoint_every=50, keep_checkpoints=2, resume_from=None, prioritized_replay=False,
+                 shared_replay=False, shared_model=False, log_level="INFO", log_levels=None, sparse_adjacency=False):
         self.num_players = num_players
+        self.map_string = map_string  # needs at least num_players home systems, see map.generate_map_string
         self.episodes = episodes
+        self.max_rounds = max_rounds
+        self.num_games = num_games  # games played in lockstep, episodes are rounded up to a multiple of it
         self.headless = headless
         self.models_dir = models_dir
         self.logs_dir = logs_dir
+        self.checkpoint_every = checkpoint_every  # checkpoints are taken between batches of games
+        self.keep_checkpoints = keep_checkpoints
+        self.episode = 0
+        self.rng_state = None  # of a loaded checkpoint, applied once training starts
+        self.writer = CheckpointWriter()  # checkpoints and stats are written in the background
         
         # Create timestamp for this training run
         self.timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -47,178 +144,251 @@ class Trainer:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         self.log_file = os.path.join(logs_dir, f"training_{timestamp}.log")
 
-        # Redirect all print() calls to this log file
-        sys.stdout = open(self.log_file, 'a')
-        print(f"Logging started at {timestamp}\n{'='*40}\n")
+        # Everything logged at log_level or above goes to this log file, the
+        # trainer's own messages also to the run's training.log. The games
+        # log every decision at DEBUG, e.g. log_levels={"player": "DEBUG"}
+        self.log_writer = LogWriter({
+            self.log_file: None,
+            os.path.join(self.run_dir, "training.log"): __name__,
+        }, level=log_level, levels=log_levels)
+        self._log(f"Logging started at {timestamp}")
         
-        # Initialize models for each player
-        self.models = [
-            TwilightImperiumRL(
-                input_feature_dim=19,  # Adjust as needed
-                hidden_dims=[64, 128, 64],
-                gamma=0.99,
-                epsilon=1.0,  # Start with full exploration
-                epsilon_decay=0.995,
-                epsilon_min=0.1,
-                learning_rate=0.001
-            )
-            for _ in range(num_players)
-        ]
+        # Initialize models for each player, with shared replay their boards are stored once
+        # for all of them, as many as their memories of 10000 transitions each refer to
+        self.replay_store = SharedReplayStore(10000 * num_players) if shared_replay else None
+        # how the models are built, parallel actors build theirs the same way
+        self.model_config = {"prioritized_replay": prioritized_replay, "shared_model": shared_model,
+                             "sparse_adjacency": sparse_adjacency}
+        self.models = create_models(num_players, replay_store=self.replay_store, **self.model_config)
+        self.shared_model = shared_model
+        self.networks = distinct_models(self.models)  # what is trained and saved, one per seat or a shared one
+
+        if resume_from is not None:
+            self.load_checkpoint(resume_from)
     
-    def _log(self, message, episode=None):
-        """Log message to episode file and console"""
-        print(message)
-        
-        # Determine which log file to write to
-        if episode is not None:
-            log_file = os.path.join(self.run_dir, f"episode_{episode:04d}.log")
-        else:
-            log_file = os.path.join(self.run_dir, "training.log")
-            
-        with open(log_file, 'a') as f:
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            f.write(f"[{timestamp}] {message}\n")
+    def _log(self, message):
+        """Log message to the training logs, see LogWriter"""
+        logger.info(message)
 
-    def save_stats(self, episode, players):
-        """Save player stats for this episode"""
+    def save_stats(self, episode, summary):
+        """Save player stats for this episode, written in the background"""
         episode_stats = {
             f"player_{i}": {
-                "name": player.name,
-                "final_points": player.points,
+                "name": name,
+                "final_points": points,
             }
-            for i, player in enumerate(players)
+            for i, (name, points) in enumerate(summary["final_points"])
         }
         
         # Save to JSON
         stats_file = os.path.join(self.stats_dir, f"episode_{episode:04d}_stats.json")
-        with open(stats_file, 'w') as f:
-            json.dump(episode_stats, f, indent=2)
+        self.writer.submit(lambda: atomic_write(stats_file, lambda f: json.dump(episode_stats, f, indent=2)))
     
     def initialize_pygame(self):
         """Set up pygame if not headless"""
         if not self.headless:
+            import pygame
             pygame.init()
             screen = pygame.display.set_mode((1280, 720))
             clock = pygame.time.Clock()
             return screen, clock
         else:
-            # Headless mode
-            os.environ["SDL_VIDEODRIVER"] = "dummy"
-            pygame.init()
-            screen = pygame.display.set_mode((1, 1))
-            clock = pygame.time.Clock()
-            return screen, clock
-    
-    def create_rl_player(self, name, _id, starting_system, starting_units, model, disposition):
-        """Create an RL player with the given model"""
-        return Player(name, _id, starting_system, starting_units, model, disposition=disposition)
+            # Headless mode, the simulation never touches pygame
+            return None, None
     
     def save_models(self, episode):
-        """Save all models"""
-        for i, model in enumerate(self.models):
-            model_path = os.path.join(self.models_dir, f"player_{i}_episode_{episode}.h5")
+        """Save the weights of all models"""
+        for i, model in enumerate(self.networks):
+            model_path = os.path.join(self.run_models_dir, f"player_{i}_episode_{episode}.weights.h5")
             model.model.save_weights(model_path)
+
+    def save_checkpoint(self):
+        """
+        Snapshots everything needed to resume training after the current
+        episode: each model (see TwilightImperiumRL.snapshot), the training
+        stats and the Python and NumPy RNG states. Only taking the snapshot
+        holds up training, it is written in the background by
+        write_checkpoint.
+        """
+        path = os.path.join(self.run_models_dir, f"checkpoint_{self.episode:04d}")
+        snapshot = {
+            "models": [model.snapshot() for model in self.networks],
+            "replay_store": self.replay_store.snapshot() if self.replay_store is not None else None,
+            "trainer": {
+                "episode": self.episode,
+                "num_players": self.num_players,
+                "map_string": self.map_string,
+                "shared_model": self.shared_model,
+                "training_stats": deepcopy(self.training_stats),
+            },
+            "rng": {"random": random.getstate(), "numpy": np.random.get_state()},
+        }
+        self.writer.submit(lambda: self.write_checkpoint(path, snapshot))
+        self._log(f"Saving checkpoint {path}")
+
+    def write_checkpoint(self, path, snapshot):
+        """
+        Writes a checkpoint snapshot to a temporary directory and renames
+        it, so a job killed mid-write leaves the previous checkpoints intact.
+        A write that fails removes the temporary directory. Only the newest
+        keep_checkpoints are kept.
+        """
+        from ti4_model import write_snapshot
+
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+        try:
+            for i, model in enumerate(snapshot["models"]):
+                write_snapshot(os.path.join(tmp_path, f"player_{i}"), model)
+            if snapshot["replay_store"] is not None:
+                np.savez_compressed(os.path.join(tmp_path, "replay_store.npz"), **snapshot["replay_store"])
+
+            with open(os.path.join(tmp_path, "trainer.json"), "w") as f:
+                json.dump(snapshot["trainer"], f, indent=2)
+            with open(os.path.join(tmp_path, "rng.pkl"), "wb") as f:
+                pickle.dump(snapshot["rng"], f)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_path, path)
+
+        prune_checkpoints(self.run_models_dir, self.keep_checkpoints)
+
+    def load_checkpoint(self, path):
+        """
+        Restores a checkpoint written by save_checkpoint, training continues
+        with the episode after it. With the same settings, a resumed run
+        plays and learns exactly like the original would have.
+
+        Building the games draws random numbers, so the RNG states are only
+        restored by train, once it has built them, see restore_rng.
+        """
+        with open(os.path.join(path, "trainer.json"), "r") as f:
+            state = json.load(f)
+        if state["num_players"] != self.num_players:
+            raise ValueError(f"Checkpoint has {state['num_players']} players, the trainer has {self.num_players}")
+        if state["map_string"] != self.map_string:
+            raise ValueError("Checkpoint was trained on a different map")
+        if state.get("shared_model", False) != self.shared_model:
+            raise ValueError("Checkpoint was trained with shared_model set differently")
+
+        store_path = os.path.join(path, "replay_store.npz")
+        if (self.replay_store is not None) != os.path.exists(store_path):
+            raise ValueError("Checkpoint was trained with shared_replay set differently")
+        if self.replay_store is not None:
+            self.replay_store.load(store_path)
+
+        for i, model in enumerate(self.networks):
+            model.load(os.path.join(path, f"player_{i}"))
+
+        self.episode = state["episode"]
+        self.training_stats = state["training_stats"]
+
+        with open(os.path.join(path, "rng.pkl"), "rb") as f:
+            self.rng_state = pickle.load(f)
+
+        self._log(f"Resumed from {path} after episode {self.episode}")
+
+    def restore_rng(self):
+        """Puts back the RNG states of a loaded checkpoint"""
+        if self.rng_state is not None:
+            random.setstate(self.rng_state["random"])
+            np.random.set_state(self.rng_state["numpy"])
+            self.rng_state = None
+
+    def checkpoint_due(self, previous_episode):
+        """Whether a multiple of checkpoint_every was passed since previous_episode"""
+        return self.episode // self.checkpoint_every > previous_episode // self.checkpoint_every
     
+    def create_simulation(self):
+        """
+        Builds the games and RL players once, episodes reset them in place
+        """
+        screen, clock = self.initialize_pygame()
+        env = VectorSimulation(self.num_games, self.models, max_rounds=self.max_rounds, screen=screen, clock=clock,
+                               record=True, map_string=self.map_string)
+        players = [create_players(sim, self.models) for sim in env.games]
+        return env, players
+
+    def end_episode(self, episode, summary):
+        """
+        Logs a finished game, trains the models on their memory and handles
+        the periodic exploration decay, checkpoints and target updates
+        """
+        final_points = summary["final_points"]
+        victors = [(name, points) for name, points in final_points if points >= summary["victory_points"]]
+        if victors:
+            victor = max(victors, key=lambda x: x[1])
+            self._log(f"[Episode {episode}] {victor[0]} won in round {summary['round']}!")
+        else:
+            # If we reached max rounds without a victor
+            # Find player with highest points
+            best_player = max(final_points, key=lambda x: x[1])
+            self._log(f"[Episode {episode}] No winner after {summary['max_rounds']} rounds. {best_player[0]} leads with {best_player[1]} points.")
+        
+        # Log final points
+        self._log(f"[Episode {episode}] Final points:")
+        for name, points in final_points:
+            self._log(f"{name}: {points}")
+        self.save_stats(episode, summary)
+        
+        # Train models on collected experiences
+        for model in self.networks:
+            model.replay(steps=10)  # Train multiple times on memory
+        
+        # Decay exploration rates
+        for model in self.networks:
+            if model.epsilon > model.epsilon_min:
+                model.epsilon *= model.epsilon_decay
+            self._log(f"Model epsilon: {model.epsilon:.4f}")
+        
+        # Update target networks every 10 episodes
+        if episode % 10 == 0:
+            for model in self.networks:
+                model.update_target_model()
+
     def train(self):
         """Run training loop"""
-        for episode in range(self.episodes):
-            self._log(f"Starting episode {episode+1}/{self.episodes}")
-            
-            # Initialize pygame
-            screen, clock = self.initialize_pygame()
-            
-            # Create simulation without initializing players
-            sim = Simulation(screen, clock)
-            
-            # Replace default players with RL players
-            sim.players = []
-            starting_systems = random.sample(sim.game_map.get_start_tiles(), len(sim.game_map.get_start_tiles()))
-            dispositions = ["balanced", "defensive", "despot"]
-            
-            for i in range(self.num_players):
-                # Default units for each player
-                starting_units = [
-                    Carrier(), Carrier(),
-                    GroundForce(), GroundForce(), GroundForce(), GroundForce(),
-                    Destroyer(), SpaceDock()
-                ]
-                
-                # Create RL player with corresponding model
-                rl_player = self.create_rl_player(
-                    f"RLPlayer_{i} ({dispositions[i]})",
-                    _id=i,
-                    starting_system=starting_systems[i],
-                    starting_units=starting_units,
-                    model=self.models[i],
-                    disposition=dispositions[i]
-                )
-                
-                sim.players.append(rl_player)
-            
-            # Reset player tracker
-            sim.player_tracker = sim.player_tracker.__class__(sim.players)
-            
-            # Run game for max rounds or until completion
-            max_rounds = 10
-            sim.game_round = 1
-            
-            while not sim.game_over and sim.game_round <= max_rounds:
-                if sim.phase == "strategy":
-                    self._log(f"[Episode {episode+1}] Round {sim.game_round}")
-                    for player in sim.players:
-                        self._log(f"{player.name} has {player.points} points")
-                    
-                    sim.strategy_phase()
-                elif sim.phase == "action":
-                    sim.take_turn()
-                elif sim.phase == "status":
-                    sim.status_phase()
-                    sim.game_round += 1
-
-                # Check for game over
-                victors = [p for p in sim.players if p.points >= 50]
-                if victors:
-                    victor = max(victors, key=lambda x: x.points)
-                    self._log(f"[Episode {episode+1}] {victor.name} won in round {sim.game_round}!")
-                    sim.game_over = True
-            
-            # If we reached max rounds without a victor
-            if not sim.game_over:
-                # Find player with highest points
-                best_player = max(sim.players, key=lambda x: x.points)
-                self._log(f"[Episode {episode+1}] No winner after {max_rounds} rounds. {best_player.name} leads with {best_player.points} points.")
-            
-            # Log final points
-            self._log(f"[Episode {episode+1}] Final points:")
-            for player in sim.players:
-                self._log(f"{player.name}: {player.points}")
-            
-            # Train models on collected experiences
-            for model in self.models:
-                for _ in range(10):  # Train multiple times on memory
-                    model.replay()
+        env, players = self.create_simulation()
+        self.restore_rng()
+
+        while self.episode < self.episodes:
+            previous_episode = self.episode
+            first = self.episode + 1
+            self._log(f"Starting episodes {first}-{first + self.num_games - 1}/{self.episodes}")
             
-            # Decay exploration rates
-            for model in self.models:
-                if model.epsilon > model.epsilon_min:
-                    model.epsilon *= model.epsilon_decay
-                self._log(f"Model epsilon: {model.epsilon:.4f}")
+            # Seat the RL players in random home systems on a fresh board
+            env.reset(players=players, starting_systems=random_starting_systems(env))
             
-            # Save models every 50 episodes
-            if (episode + 1) % 50 == 0:
-                self.save_models(episode + 1)
-                
-            # Update target networks every 10 episodes
-            if (episode + 1) % 10 == 0:
-                for model in self.models:
-                    model.update_target_model()
+            # Run the games for max rounds or until completion, the models
+            # decide for every game at once
+            env.run()
+
+            # Store the experience of every game
+            for model, transitions in zip(self.models, env.collect_experience()):
+                for transition in transitions:
+                    model.remember(*transition)
+
+            for sim in env.games:
+                self.episode += 1
+                self.end_episode(self.episode, summarize(sim, env.victory_points, env.max_rounds))
+
+            if self.checkpoint_due(previous_episode):
+                self.save_checkpoint()
             
-            # Clean up pygame
+        # Clean up pygame
+        if not self.headless:
+            import pygame
             pygame.quit()
-            
-        # Save final models
+
+        # Save final models once the last checkpoint is on disk
+        self.writer.flush()
         self.save_models("final")
         self._log("Training complete!")
+        self.log_writer.close()
 
 def main():
     """Main function to run training"""
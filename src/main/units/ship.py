@@ -27,6 +27,8 @@ class Ship():
 
     def set_ownership(self, owner):
         self.owner = owner
+        if self.system != None:
+            self.system.touch()
 
     def make_attack_roll(self):
         """
@@ -68,6 +70,8 @@ class Ship():
         """
         self.owner = None
         self.health = 0
+        if self.system != None:
+            self.system.touch()
 
         for unit in self.in_cargo:
             unit.destroy()
@@ -88,19 +92,13 @@ class Ship():
             return list(set([tile for tile in self.system.neighbors]))
         
     def __deepcopy__(self, memo):
-        # Create a new Ship with the same properties, skipping deepcopy of 'owner'
-        copied = Ship(
-            name=self.name,
-            combat=self.combat,
-            move=self.move,
-            capacity=self.capacity,
-            cost=self.cost,
-            special_combat=self.special_combat,
-            special=self.special,
-            sustain=(self.MAXHEALTH == 2),
-        )
-        copied.health = self.health
-        copied.in_cargo = ["fighter" for f in self.in_cargo if f.name == "fighter"]
+        # Copy the ship's own state but keep a reference to the owner, deep
+        # copying it would drag the whole game along with the ship. The copy
+        # is not on the board, so what happens to it in a simulated combat
+        # must not reach the real system
+        copied = copy.copy(self)
+        copied.system = None
+        copied.in_cargo = [copy.deepcopy(unit, memo) if isinstance(unit, Ship) else copy.copy(unit) for unit in self.in_cargo]
         memo[id(self)] = copied
         return copied
 
@@ -27,7 +27,7 @@ class Dreadnought(Ship):
             }
             )
     def bombard(self):
-        hits = sum([super().make_attack_roll() for i in range(1)])
+        hits = sum([Ship.make_attack_roll(self) for i in range(1)])
         return hits
         
 class Cruiser(Ship):
@@ -58,7 +58,7 @@ class Destroyer(Ship):
             )
         
     def anti_fighter_barrage(self):
-        hits = sum([super().make_attack_roll() for i in range(2)])
+        hits = sum([Ship.make_attack_roll(self) for i in range(2)])
         return hits
         
 class WarSun(Ship):
@@ -79,11 +79,11 @@ class WarSun(Ship):
             )
         
     def make_attack_roll(self):
-        hits = sum([super().make_attack_roll() for i in range(3)])
+        hits = sum([Ship.make_attack_roll(self) for i in range(3)])
         return hits
     
     def bombard(self):
-        hits = sum([super().make_attack_roll() for i in range(3)])
+        hits = sum([Ship.make_attack_roll(self) for i in range(3)])
         return hits
         
 class Fighter(Ship):
@@ -1,9 +1,25 @@
 import json
+import importlib
 
 def load_json(file):
     with open(file, "r") as f:
         return json.load(f)
     
+class LazyModule():
+    """
+    Stands in for a module and imports it on first attribute access.
+    Pyomo, TensorFlow and matplotlib each take seconds to import, so rule and
+    combat code that may never need them loads them this way.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
 from itertools import chain, combinations
 
 def powerset(iterable):
@@ -0,0 +1,183 @@
+import random
+from contextlib import contextmanager
+
+from simulation import Simulation, DEFAULT_MAP_STRING
+
+# the actions the models rank, the recorded action is the index of the top one
+ACTIONS = ["reinforce", "produce", "attack"]
+
+class VectorSimulation():
+    def __init__(self, num_games, models, max_rounds=10, victory_points=50, screen=None, clock=None, record=False,
+                 map_string=DEFAULT_MAP_STRING):
+        """
+        Plays several games in lockstep. Every step, each unfinished
+        game is advanced to its next model decision and all of those decisions
+        are made together, one forward pass per model, instead of one predict
+        call per turn.
+
+        Attributes:
+            games (list[Simulation]): The games, all seated with the same models
+            models (list): Model for each seat, shared across games
+            map_string (str): The galaxy every game is played on
+
+        Only the first game is drawn when a screen is given. With record set,
+        every decision is kept as a (state, action, reward, next_state, done)
+        transition for its seat, see collect_experience. Games reset with
+        seeds each roll their dice from their own RNG stream, so they play out
+        the same as they would alone.
+        """
+        self.models = models
+        self.max_rounds = max_rounds
+        self.victory_points = victory_points
+
+        self.record = record
+        self.experience = [[] for _ in models]
+        # per game, the last decision of each seat: (state, action, points)
+        self.open_transitions = [dict() for _ in range(num_games)]
+        # per game, the state of the Python RNG the rules draw from, None
+        # while the games share the global one
+        self.rng_states = None
+
+        self.games = [
+            Simulation(screen, clock, models=models, map_string=map_string) if i == 0
+            else Simulation(models=models, map_string=map_string)
+            for i in range(num_games)
+        ]
+
+    def reset(self, seeds=None, players=None, starting_systems=None):
+        """
+        Restarts every game, see Simulation.reset
+
+        Args:
+            seeds (list): Seed for each game, each game then keeps its own
+                RNG stream
+            players (list): Players to seat in each game
+            starting_systems (list): Home systems for each game
+        """
+        self.rng_states = None if seeds is None else [None] * len(self.games)
+        for i, game in enumerate(self.games):
+            with self.playing(i):
+                game.reset(
+                    seed=seeds[i] if seeds is not None else None,
+                    players=players[i] if players is not None else None,
+                    starting_systems=starting_systems[i] if starting_systems is not None else None
+                )
+        self.open_transitions = [dict() for _ in self.games]
+
+    @contextmanager
+    def playing(self, i):
+        """
+        Swaps the RNG state of game i in for the global one while a part of
+        its turn is played, nothing is swapped without seeds. Only the Python
+        RNG is swapped: NumPy's is drawn from by the models' exploration,
+        which happens between the games' turns.
+        """
+        if self.rng_states is None:
+            yield
+            return
+
+        outer = random.getstate()
+        if self.rng_states[i] is not None:
+            random.setstate(self.rng_states[i])
+        try:
+            yield
+        finally:
+            self.rng_states[i] = random.getstate()
+            random.setstate(outer)
+
+    def is_over(self, game):
+        return game.game_over or game.game_round > self.max_rounds
+
+    @property
+    def done(self):
+        return all(self.is_over(game) for game in self.games)
+
+    def check_victory(self, game):
+        victors = [p for p in game.players if p.points >= self.victory_points]
+        if victors:
+            game.game_over = True
+
+    def advance(self, game):
+        """
+        Plays the phases that need no model decision, returns the player whose
+        turn it is or None once the game is over
+        """
+        while not self.is_over(game):
+            if game.phase == "strategy":
+                game.strategy_phase()
+            elif game.phase == "action":
+                if (player := game.next_player()) is not None:
+                    return player
+            elif game.phase == "status":
+                game.status_phase()
+                game.game_round += 1
+
+            self.check_victory(game)
+        return None
+
+    def step(self):
+        """
+        Takes one turn in every unfinished game, returns how many were taken
+        """
+        pending = []
+        for i, game in enumerate(self.games):
+            with self.playing(i):
+                player = self.advance(game)
+            if player is not None:
+                pending.append((i, game, player))
+            elif self.record:
+                self.close_transitions(i, game)
+
+        states = [player.get_state(game.game_map) for _, game, player in pending]
+
+        # one batch per model, the seats of every game share them
+        batches = {}
+        for i, (_, _, player) in enumerate(pending):
+            batches.setdefault(player.model, []).append(i)
+
+        decisions = [None] * len(pending)
+        for model, indices in batches.items():
+            for i, decision in zip(indices, model.choose_actions([states[i] for i in indices], ACTIONS)):
+                decisions[i] = decision
+
+        for (i, game, player), state, decision in zip(pending, states, decisions):
+            if self.record:
+                self.add_transition(i, game, player, state, ACTIONS.index(decision[0]))
+            with self.playing(i):
+                game.execute_action(player.act(decision))
+            self.check_victory(game)
+
+        return len(pending)
+
+    def add_transition(self, i, game, player, state, action):
+        """
+        Completes the seat's previous transition with this state and opens a
+        new one. The reward is the share of the victory points gained between
+        the two decisions.
+        """
+        seat = game.players.index(player)
+        if seat in self.open_transitions[i]:
+            last_state, last_action, points = self.open_transitions[i][seat]
+            reward = (player.points - points) / self.victory_points
+            self.experience[seat].append((last_state, last_action, reward, state, False))
+        self.open_transitions[i][seat] = (state, action, player.points)
+
+    def close_transitions(self, i, game):
+        """Ends the open transitions of a finished game"""
+        for seat, (state, action, points) in self.open_transitions[i].items():
+            reward = (game.players[seat].points - points) / self.victory_points
+            self.experience[seat].append((state, action, reward, state, True))
+        self.open_transitions[i].clear()
+
+    def collect_experience(self):
+        """
+        Returns the transitions recorded for each seat since the last call
+        """
+        experience = self.experience
+        self.experience = [[] for _ in self.models]
+        return experience
+
+    def run(self):
+        """Plays every game to the end"""
+        while self.step():
+            pass
@@ -0,0 +1,30 @@
+from collections import OrderedDict
+
+import numpy as np
+
+import board_encoder
+from board_encoder import get_edges
+from map import Map, generate_map_string
+
+def normalized_adjacency(map_string):
+    return Map(map_string=map_string).encode_board_state()[1]
+
+def test_static_graphs_of_the_recent_layouts_are_kept(monkeypatch):
+    monkeypatch.setattr(board_encoder, "_graphs", OrderedDict())
+    monkeypatch.setattr(board_encoder, "MAX_GRAPHS", 2)
+    map_strings = [generate_map_string(radius=2, seed=seed) for seed in range(3)]
+
+    first = normalized_adjacency(map_strings[0])
+    # a layout used again is shared, its edge list is looked up
+    assert normalized_adjacency(map_strings[0]) is first
+    assert get_edges(first)[0] is board_encoder._graphs[tuple(map(int, map_strings[0].split()))][2]
+
+    for map_string in map_strings[1:]:
+        normalized_adjacency(map_string)
+    assert list(board_encoder._graphs) == [tuple(map(int, s.split())) for s in map_strings[1:]]
+
+    # the evicted layout's matrix is scanned instead
+    edges, values = get_edges(first)
+    assert np.array_equal(edges, np.argwhere(first))
+    assert np.array_equal(values, first[tuple(edges.T)])
+    assert normalized_adjacency(map_strings[0]) is not first
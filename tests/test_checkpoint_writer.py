@@ -0,0 +1,45 @@
+import json
+import threading
+
+import pytest
+
+from checkpoint_writer import CheckpointWriter, atomic_write
+
+def test_flush_raises_a_failed_write_and_leaves_no_partial_file(tmp_path):
+    path = tmp_path / "episode_1.json"
+    atomic_write(path, lambda f: json.dump({"episode": 0}, f))
+
+    def write(f):
+        f.write('{"episode": ')
+        raise OSError("No space left on device")
+
+    writer = CheckpointWriter()
+    writer.submit(lambda: atomic_write(path, write))
+    with pytest.raises(OSError, match="No space left"):
+        writer.flush()
+
+    # the old file is untouched and the partly written one is gone
+    assert [p.name for p in tmp_path.iterdir()] == ["episode_1.json"]
+    assert json.loads(path.read_text()) == {"episode": 0}
+
+    # the error is raised once, later jobs run again
+    writer.submit(lambda: atomic_write(path, lambda f: json.dump({"episode": 1}, f)))
+    writer.close()
+    assert json.loads(path.read_text()) == {"episode": 1}
+
+def test_submit_waits_while_max_pending_jobs_are_queued():
+    release = threading.Event()
+    written = []
+    writer = CheckpointWriter(max_pending=1)
+    writer.submit(release.wait)    # being written
+    writer.submit(lambda: written.append(1))  # waiting in the queue
+
+    third = threading.Thread(target=writer.submit, args=(lambda: written.append(2),))
+    third.start()
+    third.join(timeout=0.2)
+    assert third.is_alive()
+
+    release.set()
+    third.join(timeout=5)
+    writer.close()
+    assert not third.is_alive() and written == [1, 2]
@@ -0,0 +1,45 @@
+import random
+from copy import deepcopy
+
+from combat_sim import run_n_simulations
+from tile import Tile
+from units.unit_types import Carrier, Cruiser, Destroyer, Dreadnought, WarSun
+
+def test_combat_with_war_suns_and_dreadnoughts():
+    random.seed(0)
+    fleet_1 = [WarSun(), Dreadnought(), Destroyer()]
+    fleet_2 = [Dreadnought(), Carrier(), Destroyer()]
+
+    wins, losses, draws = run_n_simulations(fleet_1, fleet_2, n=50)
+
+    assert wins + losses + draws == 1
+    assert wins > losses
+    # the fleets that were simulated are left as they were
+    assert all(ship.health == ship.MAXHEALTH for ship in fleet_1 + fleet_2)
+
+def test_ship_copies_are_detached_from_the_board():
+    carrier = Carrier()
+    carrier.in_cargo.append(Destroyer())
+    # stands in for the tile the fleet is in
+    carrier.system = carrier.in_cargo[0].system = object()
+
+    copied = deepcopy(carrier)
+
+    # destroying the copy in a simulated combat must not reach the real ships
+    assert type(copied.in_cargo[0]) is Destroyer
+    assert copied.system is None and copied.in_cargo[0].system is None
+    copied.destroy()
+    assert carrier.in_cargo[0].health == carrier.in_cargo[0].MAXHEALTH
+
+def test_simulated_combat_leaves_the_real_system_unchanged():
+    random.seed(0)
+    system = Tile(0, 0, 0, 0, data={"planets": [], "wormhole": None})
+    defender = Destroyer()
+    defender.move_to_system(system)
+    version = system.version
+
+    run_n_simulations([Dreadnought(), Cruiser()], [defender], n=100)
+
+    # the encoder would re-encode a system whose version moved on
+    assert system.version == version
+    assert defender.health == defender.MAXHEALTH
@@ -0,0 +1,37 @@
+import queue
+
+import pytest
+
+from parallel_trainer import ActorError, next_experience
+
+class Actor():
+    def __init__(self, exitcode=None):
+        self.exitcode = exitcode
+
+    def is_alive(self):
+        return self.exitcode is None
+
+def test_next_experience_returns_the_batches_of_running_actors():
+    experience_queue = queue.Queue()
+    experience_queue.put((0, 1, [], []))
+
+    assert next_experience(experience_queue, [Actor()], poll_every=0.01) == (0, 1, [], [])
+
+def test_next_experience_raises_when_an_actor_died():
+    experience_queue = queue.Queue()
+    # the other actors keep sending experience
+    experience_queue.put((0, 1, [], []))
+
+    # killed, e.g. for running out of memory
+    with pytest.raises(ActorError, match="Actor 1 exited with code -9"):
+        next_experience(experience_queue, [Actor(), Actor(exitcode=-9)], poll_every=0.01)
+
+    with pytest.raises(ActorError, match="Actor 0 exited with code 1"):
+        next_experience(queue.Queue(), [Actor(exitcode=1)], poll_every=0.01)
+
+def test_next_experience_raises_the_failure_an_actor_sent():
+    experience_queue = queue.Queue()
+    experience_queue.put(ActorError("Actor 0 failed:\nValueError"))
+
+    with pytest.raises(ActorError, match="ValueError"):
+        next_experience(experience_queue, [Actor(exitcode=1)], poll_every=0.01)
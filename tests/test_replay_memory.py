@@ -0,0 +1,101 @@
+import random
+
+import numpy as np
+
+from map import Map
+from replay_memory import PerspectiveMemory, PrioritizedReplayMemory, ReplayMemory, SharedReplayStore, SumTree
+from simulation import DEFAULT_MAP_STRING
+
+def test_edge_batch_holds_the_entries_of_the_dense_batch():
+    features, adjacency = Map(map_string=DEFAULT_MAP_STRING).encode_board_state()
+    memory = ReplayMemory(capacity=8)
+    # a second graph, as if it came from another process
+    other = adjacency.copy()
+    other[0, 1] = other[1, 0] = 0
+    for graph in [adjacency, other, adjacency]:
+        memory.add((features, graph, np.zeros(20)), 0, 0.0, (features, graph, np.zeros(20)), False)
+
+    graph_ids = memory.graph[[0, 1, 2, 1]]
+    dense = memory.adjacency_batch(graph_ids)
+    indices, values = memory.edge_batch(graph_ids)
+
+    assert len(memory.graphs) == 2
+    assert np.array_equal(indices, np.argwhere(dense))
+    assert np.array_equal(values, dense[tuple(indices.T)])
+
+def transition(i):
+    """A transition on a three tile board, told apart by its reward"""
+    state = (np.zeros((3, 19)), np.eye(3, dtype=np.float32), np.zeros(20))
+    return state, 0, float(i), state, False
+
+def test_sum_tree_root_holds_the_sum_of_the_leaves():
+    tree = SumTree(6)
+    tree.update([0, 1, 2, 3, 4, 5], [1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+    # the last priority of a repeated index is the one kept
+    tree.update([2, 5, 2, 0], [0.5, 1.5, 7.0, 0.0])
+    tree.set(4, 2.5)
+
+    leaves = tree.get(np.arange(tree.leaves))
+    assert np.array_equal(leaves[:6], [0.0, 2.0, 7.0, 4.0, 2.5, 1.5])
+    assert tree.total == leaves.sum()
+    # every inner node as well
+    for node in range(1, tree.leaves):
+        assert tree.tree[node] == tree.tree[2 * node] + tree.tree[2 * node + 1]
+
+def test_prioritized_samples_follow_the_priorities():
+    np.random.seed(0)
+    memory = PrioritizedReplayMemory(capacity=4, alpha=1.0, min_priority=0.0)
+    for i in range(4):
+        memory.add(*transition(i))
+    memory.update_priorities(np.arange(4), np.array([1.0, 2.0, 3.0, 4.0]))
+
+    counts = np.zeros(4)
+    for _ in range(2000):
+        _, _, _, _, _, indices, weights = memory.sample(8)
+        counts += np.bincount(indices, minlength=4)
+        # the importance weights are scaled so the largest is 1
+        assert weights.max() == 1.0 and np.all(weights > 0)
+
+    assert np.allclose(counts / counts.sum(), [0.1, 0.2, 0.3, 0.4], atol=0.01)
+
+def test_new_transitions_get_the_highest_priority_seen():
+    memory = PrioritizedReplayMemory(capacity=4)
+    for i in range(4):
+        memory.add(*transition(i))
+    memory.update_priorities(np.array([1, 2]), np.array([0.5, 9.0]))
+    highest = memory.max_priority
+    assert highest == (9.0 + memory.min_priority) ** memory.alpha
+
+    # the buffer wrapped, the new transition replaces the oldest one
+    memory.add(*transition(4))
+
+    assert memory.rewards[0] == 4.0
+    assert memory.priorities.get(0) == highest
+    assert memory.priorities.total == sum(memory.priorities.get(np.arange(4)))
+
+def test_shared_store_keeps_boards_once_and_while_they_are_used():
+    random.seed(0)
+    adjacency = np.eye(3, dtype=np.float32)
+    boards = [np.full((3, 19), i, dtype=np.float32) for i in range(5)]
+    store = SharedReplayStore(capacity=4)
+    first, second = PerspectiveMemory(store), PerspectiveMemory(store)
+
+    def add(memory, i):
+        memory.add((boards[i], adjacency, np.zeros(20)), 0, float(i), (boards[i + 1], adjacency, np.zeros(20)), False)
+
+    add(first, 0)
+    # consecutive transitions share a board, it is stored once
+    add(second, 1)
+    add(second, 2)
+    assert store.count == 4
+    assert first.next_board[0] == second.board[0]
+
+    # the store overwrites board 0, first's transition on it expires but
+    # board 1, its next state, stays for second
+    add(second, 3)
+    assert store.count == 5 and store.oldest == 1
+    assert len(first) == 0 and len(second) == 3
+
+    states, _, rewards, next_states, _, _, _ = second.sample(3)
+    assert np.array_equal(states[0][:, 0, 0], rewards)
+    assert np.array_equal(next_states[0][:, 0, 0], rewards + 1)
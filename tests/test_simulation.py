@@ -0,0 +1,101 @@
+import random
+
+import numpy as np
+import pytest
+
+from map import generate_map_string
+from simulation import DEFAULT_MAP_STRING, Simulation
+from state import STATE_MAGIC, STATE_VERSION
+from vector_simulation import VectorSimulation
+
+# the game rules never call the models, the players only keep them
+MODEL = object()
+
+@pytest.mark.parametrize("map_string, num_players", [
+    (DEFAULT_MAP_STRING, 3),
+    (generate_map_string(radius=4, num_players=6, seed=1), 2),
+], ids=["default map", "more home systems than players"])
+def test_reset_gives_the_game_a_new_simulation_starts(map_string, num_players):
+    random.seed(7)
+    np.random.seed(7)
+    fresh = Simulation(models=[MODEL] * num_players, map_string=map_string)
+
+    sim = Simulation(models=[MODEL] * num_players, map_string=map_string)
+    for tile in sim.game_map.tiles.values():
+        for planet in tile.planets:
+            planet.ready()
+    sim.reset(seed=7)
+
+    assert sim.to_bytes() == fresh.to_bytes()
+
+class OrderedModel():
+    """Ranks the actions by the board it is shown, without any randomness"""
+    num_seats = 3
+
+    def choose_actions(self, states, actions):
+        out = []
+        for features, _, player_features in states:
+            shift = int(np.sum(features) + sum(player_features)) % len(actions)
+            out.append(actions[shift:] + actions[:shift])
+        return out
+
+def transition_key(transition):
+    state, action, reward, next_state, done = transition
+    return (state[0].tobytes(), tuple(state[2]), action, reward, next_state[0].tobytes(), done)
+
+def play(num_games, seeds):
+    env = VectorSimulation(num_games, [OrderedModel()] * 3, max_rounds=3, record=True)
+    env.reset(seeds=seeds)
+    env.run()
+    return [sorted(map(transition_key, seat)) for seat in env.collect_experience()]
+
+def test_lockstep_games_play_like_games_played_one_by_one():
+    seeds = [1, 2, 3]
+    one_by_one = [[] for _ in range(3)]
+    for seed in seeds:
+        for seat, transitions in enumerate(play(1, [seed])):
+            one_by_one[seat].extend(transitions)
+
+    lockstep = play(len(seeds), seeds)
+    assert all(len(seat) > len(seeds) for seat in lockstep)
+    assert lockstep == [sorted(seat) for seat in one_by_one]
+
+def play_a_little(sim):
+    """Changes a planet, a tile, a player and the RNG from the starting state"""
+    player = sim.players[1]
+    planet = next(planet for tile in sim.game_map.tiles.values() for planet in tile.planets if planet.owner is None)
+    player.add_planet(planet)
+    planet.place_pds()
+    player.activate(planet.system)
+    player.points = 2
+    random.random()
+    return planet
+
+def test_encoded_state_loads_into_a_new_simulation():
+    random.seed(3)
+    np.random.seed(3)
+    sim = Simulation(models=[MODEL] * 3)
+    planet = play_a_little(sim)
+    data = sim.to_bytes()
+
+    other = Simulation(models=[MODEL] * 3)
+    other.load_bytes(data)
+
+    assert other.to_bytes() == data
+    loaded = next(p for tile in other.game_map.tiles.values() for p in tile.planets if p.name == planet.name)
+    assert loaded.owner is other.players[1] and loaded in other.players[1].planets
+    assert loaded.num_pds == 1 and other.players[1].points == 2
+    assert other.players[1].command_counters == sim.players[1].command_counters
+
+def test_encoded_state_is_checked_before_it_is_loaded():
+    sim = Simulation(models=[MODEL] * 3)
+    data = sim.to_bytes()
+
+    with pytest.raises(ValueError, match="Not an encoded game state"):
+        sim.load_bytes(b"XXXX" + data[len(STATE_MAGIC):])
+    with pytest.raises(ValueError, match=f"Unsupported game state version {STATE_VERSION + 1}"):
+        sim.load_bytes(STATE_MAGIC + bytes([STATE_VERSION + 1]) + data[len(STATE_MAGIC) + 1:])
+
+    elsewhere = Simulation(models=[MODEL] * 3, map_string=generate_map_string(radius=3, num_players=3, seed=1))
+    with pytest.raises(ValueError, match="different map"):
+        elsewhere.load_bytes(data)
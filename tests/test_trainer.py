@@ -0,0 +1,13 @@
+import os
+
+from trainer import prune_checkpoints
+
+def test_prune_checkpoints_keeps_the_newest_episodes(tmp_path):
+    for name in ["checkpoint_9998", "checkpoint_9999", "checkpoint_10000", "checkpoint_10001", "checkpoint_10002.tmp"]:
+        os.makedirs(tmp_path / name)
+    (tmp_path / "player_0_episode_final.weights.h5").touch()
+
+    prune_checkpoints(tmp_path, keep=2)
+
+    assert sorted(os.listdir(tmp_path)) == [
+        "checkpoint_10000", "checkpoint_10001", "checkpoint_10002.tmp", "player_0_episode_final.weights.h5"]